@@ -4,13 +4,16 @@ import os
 import sys
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, Gdk, GLib, Gio, GdkPixbuf
+from gi.repository import Gtk, Gdk, GLib, Gio, GdkPixbuf, Pango
 import fcntl
 import socket
 
 class DexterOrganizer(Gtk.Window):
     def __init__(self):
         super(DexterOrganizer, self).__init__(type=Gtk.WindowType.TOPLEVEL)
+        # Preferencias compartidas: se leen una vez y se consultan en memoria
+        from modules.dexter_preferents import get_preferences
+        self.preferences = get_preferences()
         self.theme = "light"  # Inicialización por defecto del tema
         # Definir rutas absolutas a los CSS de tema
         base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -25,6 +28,10 @@ class DexterOrganizer(Gtk.Window):
             self.css_provider,
             Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
         )
+        if self.preferences.get_string("theme") == "dark" and os.path.exists(self.dark_theme):
+            self.css_provider.load_from_path(self.dark_theme)
+            self.theme = "dark"
+        self.preferences.connect("changed::theme", self.on_theme_preference_changed)
         
         # Configuración de la ventana principal
         self.set_decorated(False)  # Sin decoraciones de ventana
@@ -34,16 +41,23 @@ class DexterOrganizer(Gtk.Window):
         self.set_size_request(950, 700)
 
         # El resto de la apariencia se controla por CSS externo
-        self.connect("delete-event", Gtk.main_quit)
+        self.connect("delete-event", self.on_delete_event)
         self.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
         self.connect("button-press-event", self.on_window_drag)
         self.connect_after("button-press-event", self.on_global_click)
+        self.connect("key-press-event", self.on_key_press)
         screen = self.get_screen()
         visual = screen.get_rgba_visual()
         if visual and screen.is_composited():
             self.set_visual(visual)
         self.connect("draw", self.on_draw)
         
+        # Módulo visible y documentos abiertos (ruta -> vista, creada al mostrarla)
+        self.active_module = "start"
+        self.active_document = None
+        self.open_documents = {}
+        self.document_states = {}
+        
         # Contenedor principal - Horizontal para dividir izquierda y derecha
         self.main_container = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
         self.main_container.set_name("main-container")
@@ -81,8 +95,11 @@ class DexterOrganizer(Gtk.Window):
         # Crear buffer de texto para mensajes
         self.textbuffer = Gtk.TextBuffer()
         
-        # Cargar el módulo de inicio por defecto
-        self.load_start_module()
+        # Recuperar la sesión anterior (o cargar el módulo de inicio)
+        from modules.dexter_session import DexterSession
+        self.session = DexterSession()
+        self.restore_session()
+        self.session.start_autosave(self.session_state)
         
         # Mostrar todo
         self.show_all()
@@ -93,13 +110,18 @@ class DexterOrganizer(Gtk.Window):
         self.sidebar_container.set_name("sidebar-container")
     
         # Añadir una lista para opciones del sidebar
-        sidebar_options = Gtk.ListBox()
+        self.sidebar_options = sidebar_options = Gtk.ListBox()
         sidebar_options.set_selection_mode(Gtk.SelectionMode.SINGLE)
         sidebar_options.set_name("sidebar-options")
         
-        # Añadir algunas opciones de ejemplo
-        option_items = ["Inicio", "Actualizaciones"]
-        for i, option in enumerate(option_items):
+        # Opciones del sidebar: etiqueta, icono y acción al activarla
+        self.sidebar_items = [
+            ("Inicio", "go-home-symbolic", self.load_start_module),
+            ("Actualizaciones", "software-update-available-symbolic", None),
+            ("Duplicados", "edit-copy-symbolic", self.load_duplicates_module),
+            ("Conversión", "document-save-as-symbolic", self.load_converter_module),
+        ]
+        for option, icon_name, callback in self.sidebar_items:
             # Crear un contenedor para cada opción
             option_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
             option_box.set_margin_start(10)
@@ -108,8 +130,7 @@ class DexterOrganizer(Gtk.Window):
             option_box.set_margin_bottom(8)
             
             # Obtener un icono apropiado para cada opción
-            icon_names = ["go-home-symbolic", "software-update-available-symbolic"]
-            option_icon = Gtk.Image.new_from_icon_name(icon_names[i], Gtk.IconSize.MENU)
+            option_icon = Gtk.Image.new_from_icon_name(icon_name, Gtk.IconSize.MENU)
             option_label = Gtk.Label(label=f" {option}")
             option_label.set_halign(Gtk.Align.START)
             
@@ -123,8 +144,183 @@ class DexterOrganizer(Gtk.Window):
             # Añadir la opción al ListBox
             sidebar_options.add(option_event_box)
         
+        sidebar_options.connect("row-activated", self.on_sidebar_row_activated)
+        
+        # Lista de documentos abiertos
+        documents_label = Gtk.Label(label="Documentos abiertos")
+        documents_label.set_halign(Gtk.Align.START)
+        documents_label.set_margin_start(15)
+        documents_label.set_margin_top(20)
+        documents_label.get_style_context().add_class("dim-label")
+        self.documents_list = Gtk.ListBox()
+        self.documents_list.set_selection_mode(Gtk.SelectionMode.SINGLE)
+        self.documents_list.set_name("sidebar-options")
+        self.documents_list.connect("row-activated", lambda listbox, row: self.show_document(row.path))
+        documents_scroll = Gtk.ScrolledWindow()
+        documents_scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        documents_scroll.add(self.documents_list)
+        
         # Agregar todo al sidebar
         self.sidebar_container.pack_start(sidebar_options, False, False, 0)
+        self.sidebar_container.pack_start(documents_label, False, False, 0)
+        self.sidebar_container.pack_start(documents_scroll, True, True, 0)
+    
+    def on_sidebar_row_activated(self, listbox, row):
+        """Ejecuta la acción asociada a la opción del sidebar"""
+        callback = self.sidebar_items[row.get_index()][2]
+        if callback:
+            callback()
+    
+    def show_module(self, widget, name):
+        """Sustituye el contenido del contenedor principal por el widget indicado"""
+        for child in self.module_container.get_children():
+            self.module_container.remove(child)
+        self.module_container.pack_start(widget, True, True, 0)
+        widget.show_all()
+        self.active_module = name
+        if name != "document":
+            self.documents_list.unselect_all()
+    
+    def open_document(self, path):
+        """Añade el documento a los abiertos y lo muestra"""
+        self.add_document_row(path)
+        self.show_document(path)
+    
+    def add_document_row(self, path):
+        """Registra un documento abierto sin crear todavía su vista"""
+        if path in self.open_documents:
+            return
+        self.open_documents[path] = None
+        row = Gtk.ListBoxRow()
+        row.path = path
+        row_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
+        row_box.set_margin_start(10)
+        row_box.set_margin_end(5)
+        name_label = Gtk.Label(label=os.path.basename(path))
+        name_label.set_halign(Gtk.Align.START)
+        name_label.set_ellipsize(Pango.EllipsizeMode.MIDDLE)
+        name_label.set_tooltip_text(path)
+        close_button = Gtk.Button()
+        close_button.set_relief(Gtk.ReliefStyle.NONE)
+        close_button.add(Gtk.Image.new_from_icon_name("window-close-symbolic", Gtk.IconSize.MENU))
+        close_button.connect("clicked", lambda b: self.close_document(path))
+        row_box.pack_start(name_label, True, True, 5)
+        row_box.pack_end(close_button, False, False, 0)
+        row.add(row_box)
+        row.show_all()
+        self.documents_list.add(row)
+    
+    def find_document_row(self, path):
+        for row in self.documents_list.get_children():
+            if row.path == path:
+                return row
+        return None
+    
+    def show_document(self, path):
+        """Muestra un documento abierto, creando su vista la primera vez"""
+        from modules.dexter_view import DexterView
+        view = self.open_documents.get(path)
+        if view is None:
+            view = DexterView(path, self.preferences)
+            state = self.document_states.pop(path, None)
+            if state:
+                view.restore_state(state)
+            self.open_documents[path] = view
+        self.active_document = path
+        self.show_module(view, "document")
+        self.documents_list.select_row(self.find_document_row(path))
+        self.sidebar_options.unselect_all()
+    
+    def close_document(self, path):
+        """Cierra un documento abierto"""
+        row = self.find_document_row(path)
+        if row is not None:
+            self.documents_list.remove(row)
+        view = self.open_documents.pop(path, None)
+        self.document_states.pop(path, None)
+        if view is not None:
+            view.destroy()
+        if self.active_document == path:
+            self.active_document = None
+            if self.active_module == "document":
+                self.load_start_module()
+    
+    def session_state(self):
+        """Estado actual de la ventana para guardar la sesión"""
+        from modules.dexter_session import empty_session
+        state = empty_session()
+        state["module"] = self.active_module
+        state["active"] = self.active_document
+        for path, view in self.open_documents.items():
+            document = view.get_state() if view is not None else self.document_states.get(path, {})
+            state["documents"].append([path, document.get("cursor", 0), document.get("scroll", 0)])
+        if not self.quick_open.active:
+            state["search"] = self.search_entry.get_text()
+        selected = self.sidebar_options.get_selected_row()
+        state["sidebar"] = selected.get_index() if selected is not None else -1
+        return state
+    
+    def restore_session(self):
+        """Recupera la sesión guardada.
+
+        Solo se crea la vista del documento activo; el resto se abre al
+        seleccionarlo en la lista de documentos abiertos.
+        """
+        state = self.session.load()
+        for path, cursor, scroll in state["documents"]:
+            if os.path.isfile(path):
+                self.add_document_row(path)
+                self.document_states[path] = {"cursor": cursor, "scroll": scroll}
+        self.search_entry.set_text(state["search"])
+        modules = {
+            "start": self.load_start_module,
+            "about": self.cb_about,
+            "preferences": self.cb_preferences_dialog,
+            "duplicates": self.load_duplicates_module,
+            "converter": self.load_converter_module,
+        }
+        if state["module"] == "document" and state["active"] in self.open_documents:
+            self.show_document(state["active"])
+        else:
+            modules.get(state["module"], self.load_start_module)()
+        sidebar_row = self.sidebar_options.get_row_at_index(state["sidebar"])
+        if sidebar_row is not None:
+            self.sidebar_options.select_row(sidebar_row)
+    
+    def on_delete_event(self, widget, event):
+        self.quit_app()
+        # La ventana se destruye al salir del bucle principal, no antes
+        return True
+    
+    def quit_app(self):
+        """Guarda la sesión mientras la ventana sigue viva y termina el bucle principal"""
+        try:
+            self.session.stop_autosave()
+            self.session.save(self.session_state())
+        finally:
+            Gtk.main_quit()
+    
+    def on_key_press(self, widget, event):
+        # Ctrl+P activa la búsqueda de documentos por nombre
+        ctrl = event.state & Gdk.ModifierType.CONTROL_MASK
+        if ctrl and Gdk.keyval_to_lower(event.keyval) == Gdk.KEY_p:
+            self.quick_open.enter()
+            return True
+        return False
+    
+    def load_duplicates_module(self):
+        """Carga el buscador de duplicados, conservando el análisis en curso"""
+        from modules import dexter_duplicates
+        if getattr(self, "duplicates_module", None) is None:
+            self.duplicates_module = dexter_duplicates.DexterDuplicates(self.preferences)
+        self.show_module(self.duplicates_module, "duplicates")
+    
+    def load_converter_module(self):
+        """Carga la conversión por lotes, conservando el trabajo en curso"""
+        from modules import dexter_converter
+        if getattr(self, "converter_module", None) is None:
+            self.converter_module = dexter_converter.DexterConverter(self.preferences)
+        self.show_module(self.converter_module, "converter")
     
     def load_start_module(self):
         """Carga el módulo de inicio en el contenedor"""
@@ -140,6 +336,8 @@ class DexterOrganizer(Gtk.Window):
         
         self.module_container.add(self.start_module)
         self.module_container.show_all()
+        self.active_module = "start"
+        self.documents_list.unselect_all()
     
     def on_inicio_clicked(self, widget):
         """Maneja el clic en el botón de inicio"""
@@ -217,6 +415,10 @@ class DexterOrganizer(Gtk.Window):
         self.search_entry.set_hexpand(True)
         self.search_entry.set_vexpand(False)
         self.search_entry.set_name("search-entry")
+        self.search_entry.set_tooltip_text("Ctrl+P: ir a un documento por su nombre")
+        # Modo "ir a documento" sobre el mismo buscador
+        from modules.dexter_quick_open import DexterQuickOpen
+        self.quick_open = DexterQuickOpen(self.search_entry, self.preferences, self.open_document)
         
         # Contenedor para los botones de acción (derecha)
         action_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
@@ -263,7 +465,7 @@ class DexterOrganizer(Gtk.Window):
         close_icon = Gtk.Image.new_from_icon_name("window-close-symbolic", Gtk.IconSize.BUTTON)
         close_btn.add(close_icon)
         close_btn.set_name("close-button")
-        close_btn.connect("clicked", Gtk.main_quit)
+        close_btn.connect("clicked", lambda button: self.quit_app())
         
         # Botón de icono para alternar tema claro/oscuro
         self.theme_button = Gtk.Button()
@@ -310,15 +512,19 @@ class DexterOrganizer(Gtk.Window):
     
     # Método para cambiar entre temas
     def toggle_theme(self, button):
-        if self.theme == "light":
+        self.preferences.set("theme", "dark" if self.theme == "light" else "light")
+
+    def on_theme_preference_changed(self, preferences, key):
+        """Aplica el tema guardado en preferencias"""
+        self.apply_theme(preferences.get_string(key))
+
+    def apply_theme(self, theme):
+        if theme == "dark":
             # Cambiar a tema oscuro
             if os.path.exists(self.dark_theme):
                 self.css_provider.load_from_path(self.dark_theme)
                 self.theme = "dark"
                 self.theme_button.set_image(Gtk.Image.new_from_icon_name("display-brightness-symbolic", Gtk.IconSize.BUTTON))
-                # Forzar tema oscuro a nivel de aplicación
-                style_manager = Adw.StyleManager.get_default()
-                style_manager.set_color_scheme(Adw.ColorScheme.FORCE_DARK)
             else:
                 print(f"Advertencia: No se pudo encontrar el archivo CSS: {self.dark_theme}")
         else:
@@ -327,7 +533,6 @@ class DexterOrganizer(Gtk.Window):
                 self.css_provider.load_from_path(self.light_theme)
                 self.theme = "light"
                 self.theme_button.set_image(Gtk.Image.new_from_icon_name("weather-clear-night-symbolic", Gtk.IconSize.BUTTON))
-                # Forzar tema claro a nivel de aplicación
     
     def build_dexter_menu_popover(self):
         # Opciones como Popover para cierre automático
@@ -348,8 +553,17 @@ class DexterOrganizer(Gtk.Window):
         self.options_button.set_popover(options_popover)
 
     def cb_preferences_dialog(self, action=None, param=None):
-        print("Función: Mostrar preferencias")
-        self.append_text("Función: Mostrar preferencias\n")
+        # Importación local para evitar ciclos
+        from modules.dexter_preferents import DexterPreferencesView
+        # Limpiar el contenedor principal
+        for child in self.module_container.get_children():
+            self.module_container.remove(child)
+        # Crear y mostrar la vista de preferencias
+        preferences_widget = DexterPreferencesView(self.preferences)
+        self.module_container.pack_start(preferences_widget, True, True, 0)
+        preferences_widget.show_all()
+        self.active_module = "preferences"
+        self.documents_list.unselect_all()
 
     def cb_about(self, action=None, param=None):
         # Importación local para evitar ciclos
@@ -361,6 +575,8 @@ class DexterOrganizer(Gtk.Window):
         about_widget = DexterAbout()
         self.module_container.pack_start(about_widget, True, True, 0)
         about_widget.show_all()
+        self.active_module = "about"
+        self.documents_list.unselect_all()
     
     def on_draw(self, widget, cr):
         # Dibujar esquinas redondeadas manteniendo el tema del sistema
@@ -459,7 +675,13 @@ def main():
         app = DexterOrganizer()
         Gtk.main()
     finally:
-        lock_socket.close()
+        # La sesión ya se guardó en quit_app(); aquí solo se vacían las
+        # preferencias pendientes y se libera el bloqueo pase lo que pase
+        try:
+            from modules.dexter_preferents import get_preferences
+            get_preferences().close()
+        finally:
+            lock_socket.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import json
+import html
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk, GLib
+
+from modules.dexter_file_manager import iter_documents, extract_text, markdown_to_html
+from modules.dexter_preferents import CACHE_DIR, get_preferences, write_atomic
+
+JOBS_DIR = os.path.join(CACHE_DIR, "conversions")
+
+# Tipos de conversión: etiqueta, extensiones de origen y extensión de destino
+CONVERSIONS = {
+    "md-html": ("Markdown → HTML", {".md"}, ".html"),
+    "html-txt": ("HTML → texto plano", {".html", ".htm"}, ".txt"),
+    "office-txt": ("Word/Excel → texto plano", {".docx", ".xlsx"}, ".txt"),
+}
+
+# Conversiones en vuelo por proceso: limita la memoria usada por trabajos muy grandes
+IN_FLIGHT_PER_WORKER = 4
+# Intervalo mínimo entre avisos de progreso a la interfaz (segundos)
+PROGRESS_INTERVAL = 0.1
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+</head>
+<body>
+{body}</body>
+</html>
+"""
+
+
+def convert_document(kind, source, target):
+    """Convierte un documento y lo escribe en disco. Se ejecuta en el pool de procesos.
+
+    Devuelve (origen, mensaje de error o None) para no devolver el contenido al
+    proceso principal.
+    """
+    try:
+        if kind == "md-html":
+            with open(source, encoding="utf-8", errors="replace") as f:
+                body = markdown_to_html(f.read())
+            title = html.escape(os.path.splitext(os.path.basename(source))[0])
+            output = HTML_TEMPLATE.format(title=title, body=body)
+        else:
+            output = extract_text(source)
+        write_atomic(target, output)
+    except Exception as e:
+        return source, f"{type(e).__name__}: {e}"
+    return source, None
+
+
+class ConversionJob:
+    """Conversión por lotes de una categoría (carpeta) o de una selección de documentos.
+
+    Cada documento procesado (convertido o con su error) se anota en un diario
+    junto al manifiesto del trabajo, de modo que un trabajo cancelado o
+    interrumpido se puede reanudar sin repetir lo ya hecho. El diario se conserva al terminar: registra qué
+    ficheros de destino ha escrito el trabajo, los únicos que puede
+    sobrescribir al repetirlo.
+    """
+
+    def __init__(self, kind, source_root, output_dir, sources=None, progress=None, workers=None):
+        self.kind = kind
+        self.source_root = os.path.abspath(source_root)
+        self.output_dir = os.path.abspath(output_dir)
+        self.sources = sorted(sources) if sources is not None else None
+        self.progress = progress
+        self.workers = workers or os.cpu_count() or 1
+        self.cancelled = threading.Event()
+        key = json.dumps([kind, self.source_root, self.output_dir, self.sources])
+        self.job_id = hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+        self.manifest_path = os.path.join(JOBS_DIR, f"{self.job_id}.json")
+        self.journal_path = os.path.join(JOBS_DIR, f"{self.job_id}.done")
+
+    @classmethod
+    def load(cls, manifest_path, **kwargs):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        return cls(manifest["kind"], manifest["source_root"], manifest["output_dir"], manifest["sources"], **kwargs)
+
+    @staticmethod
+    def pending_manifests():
+        """Manifiestos de trabajos sin terminar, del más reciente al más antiguo"""
+        try:
+            names = [name for name in os.listdir(JOBS_DIR) if name.endswith(".json")]
+        except OSError:
+            return []
+        paths = [os.path.join(JOBS_DIR, name) for name in names]
+        return sorted(paths, key=os.path.getmtime, reverse=True)
+
+    def describe(self):
+        label = CONVERSIONS[self.kind][0]
+        origin = f"{len(self.sources)} documentos" if self.sources is not None else os.path.basename(self.source_root)
+        return f"{label}: {origin}"
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def report(self, message, fraction=None):
+        if self.progress:
+            self.progress(message, fraction)
+
+    def target_for(self, source, keep_extension=False):
+        relative = os.path.relpath(source, self.source_root)
+        if relative.startswith(os.pardir):
+            relative = os.path.basename(source)
+        if not keep_extension:
+            relative = os.path.splitext(relative)[0]
+        return os.path.join(self.output_dir, relative + CONVERSIONS[self.kind][2])
+
+    def read_journal(self):
+        """Lee el diario.
+
+        Devuelve ({origen: entrada}, destinos escritos por el trabajo); manda
+        la última entrada de cada documento, pero cuenta cualquier destino que
+        se llegó a escribir.
+        """
+        entries = {}
+        produced = set()
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Línea a medio escribir si el proceso murió
+                        continue
+                    if isinstance(entry, dict) and isinstance(entry.get("source"), str):
+                        entries[entry["source"]] = entry
+                        if not entry.get("error"):
+                            produced.add(entry.get("target"))
+        except OSError:
+            pass
+        return entries, produced
+
+    def plan_targets(self, sources, produced):
+        """Calcula el destino de cada documento sin sobrescribir nada ajeno al trabajo.
+
+        Si el destino está dentro de la carpeta de origen, o si varios
+        documentos darían el mismo nombre (a.html y a.htm), se conserva la
+        extensión de origen (a.html.txt). Un destino que ya existe y que el
+        diario no registra como escrito por este trabajo no se toca: se prueba
+        con la extensión de origen y, si también existe, el documento no se
+        convierte y se informa como error. Devuelve (destinos, errores).
+        """
+        inside = os.path.commonpath([self.source_root, self.output_dir]) == self.source_root
+        targets = {source: self.target_for(source, inside) for source in sources}
+        groups = {}
+        for source, target in targets.items():
+            groups.setdefault(target, []).append(source)
+        for group in groups.values():
+            if len(group) > 1:
+                for source in group:
+                    targets[source] = self.target_for(source, True)
+        originals = set(sources)
+        owners = {}
+        errors = []
+
+        def available(target):
+            return target not in owners and target not in originals and (target in produced or not os.path.lexists(target))
+
+        for source in sources:
+            target = targets.pop(source)
+            if not available(target):
+                alternative = self.target_for(source, True)
+                if alternative == target or not available(alternative):
+                    errors.append((source, f"El destino {target} ya existe y no se sobrescribe"))
+                    continue
+                target = alternative
+            owners[target] = source
+        return {source: target for target, source in owners.items()}, errors
+
+    def list_sources(self):
+        extensions = CONVERSIONS[self.kind][1]
+        if self.sources is not None:
+            return [path for path in self.sources if os.path.splitext(path)[1].lower() in extensions]
+        return sorted(path for path, st in iter_documents([self.source_root]) if os.path.splitext(path)[1].lower() in extensions)
+
+    def run(self):
+        """Ejecuta (o reanuda) el trabajo y devuelve (convertidos, omitidos, errores)"""
+        self.report("Preparando documentos...")
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        write_atomic(self.manifest_path, json.dumps({
+            "kind": self.kind,
+            "source_root": self.source_root,
+            "output_dir": self.output_dir,
+            "sources": self.sources,
+        }))
+        journal, produced = self.read_journal()
+        sources = self.list_sources()
+        # Comprobar las colisiones de nombres antes de enviar nada al pool
+        targets, errors = self.plan_targets(sources, produced)
+        todo = []
+        skipped = 0
+        mtimes = {}
+        for source, target in targets.items():
+            try:
+                mtimes[source] = os.stat(source).st_mtime
+            except OSError:
+                mtimes[source] = None
+            entry = journal.get(source, {})
+            if entry.get("target") == target and entry.get("mtime") == mtimes[source]:
+                # Un fallo anotado se repite igual mientras el origen no cambie
+                if entry.get("error"):
+                    errors.append((source, entry["error"]))
+                    continue
+                # Ya hecho si el destino sigue ahí
+                if os.path.exists(target):
+                    skipped += 1
+                    continue
+            todo.append(source)
+        converted = 0
+        total = len(sources) or 1
+        last_report = 0
+        context = multiprocessing.get_context("spawn")
+        with open(self.journal_path, "a", encoding="utf-8") as log, \
+                ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            queue = iter(todo)
+            in_flight = set()
+            limit = self.workers * IN_FLIGHT_PER_WORKER
+            while True:
+                # Mantener un número acotado de conversiones en vuelo
+                while not self.cancelled.is_set() and len(in_flight) < limit:
+                    source = next(queue, None)
+                    if source is None:
+                        break
+                    in_flight.add(executor.submit(convert_document, self.kind, source, targets[source]))
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    source, error = future.result()
+                    entry = {"source": source, "target": targets[source], "mtime": mtimes[source]}
+                    if error:
+                        errors.append((source, error))
+                        entry["error"] = error
+                    else:
+                        converted += 1
+                    log.write(json.dumps(entry) + "\n")
+                log.flush()
+                now = time.monotonic()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    processed = skipped + converted + len(errors)
+                    self.report(f"Convertidos {processed} de {len(sources)}", processed / total)
+        if not self.cancelled.is_set():
+            # Trabajo completo (los errores quedan anotados y no se reintentan):
+            # ya no hace falta poder reanudarlo, pero el diario se guarda para
+            # reconocer los destinos propios
+            try:
+                os.remove(self.manifest_path)
+            except OSError:
+                pass
+        return converted, skipped, errors
+
+
+class DexterConverter(Gtk.Box):
+    def __init__(self, preferences=None):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        self.preferences = preferences or get_preferences()
+        self.job = None
+        self.selection = None
+        self.init_ui()
+
+    def init_ui(self):
+        self.set_border_width(20)
+        self.set_hexpand(True)
+        self.set_vexpand(True)
+
+        title_label = Gtk.Label(label="Conversión por lotes")
+        title_label.set_halign(Gtk.Align.START)
+        title_label.get_style_context().add_class("start-title")
+        self.pack_start(title_label, False, False, 0)
+
+        grid = Gtk.Grid()
+        grid.set_row_spacing(12)
+        grid.set_column_spacing(20)
+        self.pack_start(grid, False, False, 0)
+
+        # Tipo de conversión
+        self.kind_combo = Gtk.ComboBoxText()
+        for kind, (label, extensions, extension) in CONVERSIONS.items():
+            self.kind_combo.append(kind, label)
+        self.kind_combo.set_active(0)
+        self.attach_row(grid, 0, "Conversión", self.kind_combo)
+
+        # Origen: una categoría completa o una selección de documentos
+        roots = self.preferences.get_list("document-roots")
+        self.category_radio = Gtk.RadioButton.new_with_label(None, "Categoría")
+        self.category_chooser = Gtk.FileChooserButton(title="Categoría", action=Gtk.FileChooserAction.SELECT_FOLDER)
+        if roots and os.path.isdir(roots[0]):
+            self.category_chooser.set_filename(roots[0])
+        category_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        category_box.pack_start(self.category_radio, False, False, 0)
+        category_box.pack_start(self.category_chooser, True, True, 0)
+        self.selection_radio = Gtk.RadioButton.new_with_label_from_widget(self.category_radio, "Selección")
+        select_button = Gtk.Button(label="Elegir documentos...")
+        select_button.connect("clicked", self.on_select_clicked)
+        self.selection_label = Gtk.Label(label="Ningún documento elegido")
+        selection_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        selection_box.pack_start(self.selection_radio, False, False, 0)
+        selection_box.pack_start(select_button, False, False, 0)
+        selection_box.pack_start(self.selection_label, False, False, 0)
+        source_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        source_box.pack_start(category_box, False, False, 0)
+        source_box.pack_start(selection_box, False, False, 0)
+        self.attach_row(grid, 1, "Origen", source_box)
+
+        # Carpeta de destino
+        self.output_chooser = Gtk.FileChooserButton(title="Carpeta de destino", action=Gtk.FileChooserAction.SELECT_FOLDER)
+        self.output_chooser.set_hexpand(True)
+        self.attach_row(grid, 2, "Destino", self.output_chooser)
+
+        # Trabajos cancelados o interrumpidos: se pueden reanudar o descartar
+        self.pending_combo = Gtk.ComboBoxText()
+        self.pending_combo.set_hexpand(True)
+        self.resume_button = Gtk.Button(label="Reanudar")
+        self.resume_button.connect("clicked", self.on_resume_clicked)
+        self.discard_button = Gtk.Button(label="Descartar")
+        self.discard_button.connect("clicked", self.on_discard_clicked)
+        pending_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        pending_box.pack_start(self.pending_combo, True, True, 0)
+        pending_box.pack_start(self.resume_button, False, False, 0)
+        pending_box.pack_start(self.discard_button, False, False, 0)
+        self.attach_row(grid, 3, "Pendientes", pending_box)
+
+        # Acciones
+        actions_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        self.start_button = Gtk.Button(label="Convertir")
+        self.start_button.connect("clicked", self.on_start_clicked)
+        self.cancel_button = Gtk.Button(label="Cancelar")
+        self.cancel_button.connect("clicked", self.on_cancel_clicked)
+        actions_box.pack_start(self.start_button, False, False, 0)
+        actions_box.pack_end(self.cancel_button, False, False, 0)
+        self.pack_start(actions_box, False, False, 0)
+
+        self.progress_bar = Gtk.ProgressBar()
+        self.progress_bar.set_show_text(True)
+        self.pack_start(self.progress_bar, False, False, 0)
+
+        # Errores de la última conversión
+        self.errors_buffer = Gtk.TextBuffer()
+        errors_view = Gtk.TextView(buffer=self.errors_buffer)
+        errors_view.set_editable(False)
+        errors_view.set_wrap_mode(Gtk.WrapMode.WORD_CHAR)
+        scroll = Gtk.ScrolledWindow()
+        scroll.set_hexpand(True)
+        scroll.set_vexpand(True)
+        scroll.add(errors_view)
+        self.pack_start(scroll, True, True, 0)
+
+        self.update_buttons()
+
+    def attach_row(self, grid, row, label, widget):
+        row_label = Gtk.Label(label=label)
+        row_label.set_halign(Gtk.Align.START)
+        row_label.set_valign(Gtk.Align.START)
+        grid.attach(row_label, 0, row, 1, 1)
+        grid.attach(widget, 1, row, 1, 1)
+
+    def update_buttons(self):
+        running = self.job is not None
+        self.start_button.set_sensitive(not running)
+        self.cancel_button.set_sensitive(running)
+        self.update_pending()
+        if not running:
+            self.progress_bar.set_text("Sin conversiones en curso")
+
+    def update_pending(self):
+        """Rellena la lista de trabajos pendientes, del más reciente al más antiguo"""
+        running = self.job is not None
+        self.pending_combo.remove_all()
+        for manifest_path in ConversionJob.pending_manifests():
+            try:
+                label = ConversionJob.load(manifest_path).describe()
+            except (OSError, ValueError, KeyError):
+                label = f"Trabajo ilegible ({os.path.basename(manifest_path)})"
+            self.pending_combo.append(manifest_path, label)
+        pending = self.pending_combo.get_model().iter_n_children(None) > 0
+        if pending:
+            self.pending_combo.set_active(0)
+        self.pending_combo.set_sensitive(not running and pending)
+        self.resume_button.set_sensitive(not running and pending)
+        self.discard_button.set_sensitive(not running and pending)
+
+    def on_select_clicked(self, button):
+        dialog = Gtk.FileChooserDialog(
+            title="Elegir documentos",
+            transient_for=self.get_toplevel(),
+            action=Gtk.FileChooserAction.OPEN,
+        )
+        dialog.set_select_multiple(True)
+        dialog.add_buttons("Cancelar", Gtk.ResponseType.CANCEL, "Elegir", Gtk.ResponseType.OK)
+        if dialog.run() == Gtk.ResponseType.OK:
+            self.selection = dialog.get_filenames()
+            self.selection_label.set_text(f"{len(self.selection)} documentos elegidos")
+            self.selection_radio.set_active(True)
+        dialog.destroy()
+
+    def on_start_clicked(self, button):
+        kind = self.kind_combo.get_active_id()
+        output_dir = self.output_chooser.get_filename()
+        if not output_dir:
+            self.progress_bar.set_text("Elija una carpeta de destino")
+            return
+        if self.selection_radio.get_active():
+            if not self.selection:
+                self.progress_bar.set_text("Elija los documentos a convertir")
+                return
+            source_root = os.path.commonpath([os.path.dirname(path) for path in self.selection])
+            sources = self.selection
+        else:
+            source_root = self.category_chooser.get_filename()
+            sources = None
+            if not source_root:
+                self.progress_bar.set_text("Elija una categoría")
+                return
+        self.start_job(ConversionJob(kind, source_root, output_dir, sources))
+
+    def on_resume_clicked(self, button):
+        manifest_path = self.pending_combo.get_active_id()
+        if not manifest_path:
+            return
+        try:
+            job = ConversionJob.load(manifest_path)
+        except (OSError, ValueError, KeyError) as e:
+            self.progress_bar.set_text(f"No se pudo reanudar: {e}")
+            return
+        self.start_job(job)
+
+    def on_discard_clicked(self, button):
+        # Se olvida el trabajo; su diario se conserva para reconocer sus destinos
+        manifest_path = self.pending_combo.get_active_id()
+        if not manifest_path:
+            return
+        try:
+            os.remove(manifest_path)
+        except OSError as e:
+            self.progress_bar.set_text(f"No se pudo descartar: {e}")
+            return
+        self.update_pending()
+
+    def on_cancel_clicked(self, button):
+        if self.job:
+            self.job.cancel()
+            self.progress_bar.set_text("Cancelando...")
+
+    def start_job(self, job):
+        job.progress = lambda message, fraction: GLib.idle_add(self.on_progress, message, fraction)
+        self.job = job
+        self.errors_buffer.set_text("")
+        self.progress_bar.set_fraction(0)
+        self.update_buttons()
+        threading.Thread(target=self.job_thread, args=(job,), daemon=True).start()
+
+    def job_thread(self, job):
+        # Cualquier fallo (también BrokenProcessPool si muere un proceso) debe
+        # llegar a la interfaz; el manifiesto y el diario se conservan para reanudar
+        result, error = (0, 0, []), None
+        try:
+            result = job.run()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            GLib.idle_add(self.on_job_finished, job, result, error)
+
+    def on_progress(self, message, fraction):
+        if self.job is None:
+            return False
+        self.progress_bar.set_text(message)
+        if fraction is None:
+            self.progress_bar.pulse()
+        else:
+            self.progress_bar.set_fraction(fraction)
+        return False
+
+    def on_job_finished(self, job, result, error):
+        converted, skipped, errors = result
+        self.job = None
+        self.update_buttons()
+        if error:
+            if os.path.exists(job.manifest_path):
+                error = f"{error} (se puede reanudar)"
+            self.progress_bar.set_text(f"Error: {error}")
+            return False
+        summary = f"{converted} convertidos, {skipped} ya hechos, {len(errors)} errores"
+        if job.cancelled.is_set():
+            summary = f"Cancelado: {summary}"
+        else:
+            self.progress_bar.set_fraction(1.0)
+        self.progress_bar.set_text(summary)
+        self.errors_buffer.set_text("".join(f"{source}\n    {message}\n" for source, message in errors))
+        return False
+
+
+if __name__ == "__main__":
+    win = Gtk.Window(title="DexterConverter")
+    win.set_default_size(800, 600)
+    win.connect("destroy", Gtk.main_quit)
+
+    # Crear y añadir el widget de conversión
+    view = DexterConverter()
+    win.add(view)
+
+    # Mostrar todo y ejecutar
+    win.show_all()
+    Gtk.main()
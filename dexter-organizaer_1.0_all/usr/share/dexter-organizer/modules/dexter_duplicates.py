@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import zlib
+import hashlib
+import sqlite3
+import threading
+import multiprocessing
+from array import array
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk, GLib, Gio
+
+from modules.dexter_file_manager import iter_documents, extract_text
+from modules.dexter_preferents import CACHE_DIR, get_preferences
+
+DUPLICATES_CACHE = os.path.join(CACHE_DIR, "duplicates.sqlite")
+
+# Bytes leídos para el primer filtro de ficheros con el mismo tamaño
+HEAD_SIZE = 64 * 1024
+# Firma MinHash de una sola permutación: 64 cubetas de 32 bits
+NUM_BINS = 64
+BIN_BITS = 6
+EMPTY_BIN = 0xFFFFFFFF
+# Índice LSH: 16 bandas de 4 cubetas (detecta pares con similitud >= ~0.5)
+BANDS = 16
+ROWS = NUM_BINS // BANDS
+# Similitud mínima estimada para considerar dos documentos casi iguales
+SIMILARITY_THRESHOLD = 0.8
+SHINGLE_SIZE = 4
+MIN_WORDS = 40
+# Límite de comparaciones por cubeta LSH, para que los textos repetitivos no disparen el coste
+MAX_BUCKET_COMPARISONS = 50
+
+WORD_RE = re.compile(r"\w+")
+
+
+def file_head_digest(path):
+    """Hash de los primeros HEAD_SIZE bytes del fichero"""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.blake2b(f.read(HEAD_SIZE), digest_size=16).digest()
+    except OSError:
+        return b""
+
+
+def file_digest(path):
+    """Hash del contenido completo del fichero"""
+    digest = hashlib.blake2b(digest_size=32)
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    except OSError:
+        return b""
+    return digest.digest()
+
+
+def document_signature(path):
+    """Firma MinHash (una permutación, con densificación) de los shingles de palabras del documento.
+
+    Devuelve b"" si el documento no se puede leer o es demasiado corto para compararlo.
+    """
+    try:
+        text = extract_text(path)
+    except Exception:
+        return b""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return b""
+    bins = [EMPTY_BIN] * NUM_BINS
+    mask = NUM_BINS - 1
+    for i in range(len(words) - SHINGLE_SIZE + 1):
+        shingle = " ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8")
+        # Mezcla multiplicativa para repartir bien los bits bajos del CRC
+        h = (zlib.crc32(shingle) * 0x9E3779B1) & 0xFFFFFFFF
+        slot = h & mask
+        value = h >> BIN_BITS
+        if value < bins[slot]:
+            bins[slot] = value
+    # Densificar: las cubetas vacías toman el valor de la siguiente ocupada
+    if EMPTY_BIN in bins:
+        for slot in range(NUM_BINS):
+            if bins[slot] != EMPTY_BIN:
+                continue
+            for distance in range(1, NUM_BINS):
+                value = bins[(slot + distance) & mask]
+                if value != EMPTY_BIN and value < (1 << (32 - BIN_BITS)):
+                    bins[slot] = value + (distance << (32 - BIN_BITS))
+                    break
+    return array("I", bins).tobytes()
+
+
+def compute_chunk(function, paths):
+    """Aplica la función a un bloque de rutas dentro de un proceso del pool"""
+    return [function(path) for path in paths]
+
+
+def signature_similarity(first, second):
+    """Similitud de Jaccard estimada a partir de dos firmas"""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_BINS
+
+
+class DuplicateScanner:
+    """Busca documentos duplicados y casi duplicados en las carpetas de documentos.
+
+    Los resultados por fichero (hashes y firmas) se guardan en una caché SQLite
+    indexada por ruta, tamaño y fecha de modificación, de modo que en cada
+    análisis solo se procesan los ficheros nuevos o modificados.
+    """
+
+    def __init__(self, roots, cache_path=DUPLICATES_CACHE, progress=None, workers=None):
+        self.roots = roots
+        self.cache_path = cache_path
+        self.progress = progress
+        self.workers = workers or os.cpu_count() or 1
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def report(self, message, fraction=None):
+        if self.progress:
+            self.progress(message, fraction)
+
+    def run(self):
+        """Analiza las carpetas y devuelve la lista de grupos encontrados"""
+        self.report("Buscando documentos...")
+        files = {path: (st.st_size, st.st_mtime_ns) for path, st in iter_documents(self.roots)}
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        db = sqlite3.connect(self.cache_path)
+        try:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, "
+                "head BLOB, digest BLOB, signature BLOB)"
+            )
+            self.entries = self.sync_cache(db, files)
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+                self.executor = executor
+                exact = self.find_exact(db)
+                similar = self.find_similar(db, exact)
+            if self.cancelled.is_set():
+                return []
+            groups = [{"kind": "exact", "paths": sorted(paths), "similarity": 1.0} for paths in exact]
+            groups.extend(similar)
+            self.report(f"{len(groups)} grupos encontrados en {len(files)} documentos", 1.0)
+            return groups
+        finally:
+            db.close()
+
+    def sync_cache(self, db, files):
+        """Descarta de la caché los ficheros borrados o modificados"""
+        entries = {}
+        stale = []
+        for path, size, mtime, head, digest, signature in db.execute("SELECT * FROM files"):
+            if files.get(path) == (size, mtime):
+                entries[path] = {"size": size, "head": head, "digest": digest, "signature": signature}
+            else:
+                stale.append((path,))
+        db.executemany("DELETE FROM files WHERE path = ?", stale)
+        new = []
+        for path, (size, mtime) in files.items():
+            if path not in entries:
+                entries[path] = {"size": size, "head": None, "digest": None, "signature": None}
+                new.append((path, size, mtime))
+        db.executemany("INSERT INTO files (path, size, mtime) VALUES (?, ?, ?)", new)
+        db.commit()
+        return entries
+
+    def compute(self, db, column, function, paths, message):
+        """Calcula en el pool de procesos la columna indicada para las rutas que no la tienen en caché"""
+        if self.cancelled.is_set():
+            return
+        missing = [path for path in paths if self.entries[path][column] is None]
+        done = 0
+        pending = []
+        chunksize = max(1, min(256, len(missing) // (self.workers * 8) or 1))
+        chunks = [missing[i:i + chunksize] for i in range(0, len(missing), chunksize)]
+        futures = [self.executor.submit(compute_chunk, function, chunk) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            if self.cancelled.is_set():
+                # Descartar las tareas pendientes; lo ya calculado queda en caché
+                for pending_future in futures:
+                    pending_future.cancel()
+                break
+            for path, value in zip(chunk, future.result()):
+                self.entries[path][column] = value
+                pending.append((value, path))
+            done += len(chunk)
+            if len(pending) >= 500:
+                db.executemany(f"UPDATE files SET {column} = ? WHERE path = ?", pending)
+                db.commit()
+                pending = []
+                self.report(message, done / len(missing))
+        db.executemany(f"UPDATE files SET {column} = ? WHERE path = ?", pending)
+        db.commit()
+
+    def find_exact(self, db):
+        """Agrupa por tamaño, después por hash del inicio y por último por hash completo"""
+        by_size = defaultdict(list)
+        for path, entry in self.entries.items():
+            if entry["size"] > 0:
+                by_size[entry["size"]].append(path)
+        candidates = [path for paths in by_size.values() if len(paths) > 1 for path in paths]
+        self.compute(db, "head", file_head_digest, candidates, "Comparando inicio de ficheros...")
+        by_head = defaultdict(list)
+        for path in candidates:
+            head = self.entries[path]["head"]
+            if head:
+                by_head[(self.entries[path]["size"], head)].append(path)
+        candidates = []
+        for (size, head), paths in by_head.items():
+            if len(paths) < 2:
+                continue
+            if size <= HEAD_SIZE:
+                # El inicio ya es el fichero completo
+                for path in paths:
+                    if self.entries[path]["digest"] is None:
+                        self.entries[path]["digest"] = head
+            candidates.extend(paths)
+        self.compute(db, "digest", file_digest, candidates, "Calculando hashes completos...")
+        by_digest = defaultdict(list)
+        for path in candidates:
+            digest = self.entries[path]["digest"]
+            if digest:
+                by_digest[(self.entries[path]["size"], digest)].append(path)
+        return [paths for paths in by_digest.values() if len(paths) > 1]
+
+    def find_similar(self, db, exact):
+        """Agrupa documentos casi iguales mediante firmas MinHash e índice LSH"""
+        # De cada grupo de duplicados exactos solo se compara un representante
+        copies = {path for paths in exact for path in sorted(paths)[1:]}
+        paths = [path for path in self.entries if path not in copies]
+        self.compute(db, "signature", document_signature, paths, "Calculando firmas de contenido...")
+        if self.cancelled.is_set():
+            return []
+        self.report("Comparando documentos similares...")
+        signatures = {}
+        buckets = defaultdict(list)
+        for path in paths:
+            signature = self.entries[path]["signature"]
+            if not signature:
+                continue
+            values = array("I")
+            values.frombytes(signature)
+            signatures[path] = values
+            for band in range(BANDS):
+                buckets[(band, values[band * ROWS:(band + 1) * ROWS].tobytes())].append(path)
+        neighbours = defaultdict(dict)
+        checked = set()
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            for i, first in enumerate(members):
+                for second in members[i + 1:i + 1 + MAX_BUCKET_COMPARISONS]:
+                    pair = (first, second) if first < second else (second, first)
+                    if pair in checked:
+                        continue
+                    checked.add(pair)
+                    score = signature_similarity(signatures[first], signatures[second])
+                    if score >= SIMILARITY_THRESHOLD:
+                        neighbours[first][second] = score
+                        neighbours[second][first] = score
+        # Grupos en torno a un pivote (el documento con más vecinos) en los que
+        # cada miembro se parece a todos los demás: no se encadenan documentos
+        # que van cambiando poco a poco, porque al conservar uno se eliminan
+        # los demás
+        groups = []
+        assigned = set()
+        for pivot in sorted(neighbours, key=lambda path: (-len(neighbours[path]), path)):
+            if pivot in assigned:
+                continue
+            members = [pivot]
+            lowest = 1.0
+            for candidate in sorted(neighbours[pivot], key=lambda path: (-neighbours[pivot][path], path)):
+                if candidate in assigned:
+                    continue
+                scores = [signature_similarity(signatures[candidate], signatures[member]) for member in members]
+                if min(scores) >= SIMILARITY_THRESHOLD:
+                    members.append(candidate)
+                    lowest = min(lowest, *scores)
+            if len(members) > 1:
+                assigned.update(members)
+                groups.append({"kind": "similar", "paths": sorted(members), "similarity": lowest})
+        return groups
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class DexterDuplicates(Gtk.Box):
+    def __init__(self, preferences=None):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        self.preferences = preferences or get_preferences()
+        self.scanner = None
+        self.init_ui()
+
+    def init_ui(self):
+        self.set_border_width(20)
+        self.set_hexpand(True)
+        self.set_vexpand(True)
+
+        title_label = Gtk.Label(label="Documentos duplicados")
+        title_label.set_halign(Gtk.Align.START)
+        title_label.get_style_context().add_class("start-title")
+        self.pack_start(title_label, False, False, 0)
+
+        # Barra de acciones
+        actions_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        self.scan_button = Gtk.Button(label="Analizar")
+        self.scan_button.connect("clicked", self.on_scan_clicked)
+        self.merge_button = Gtk.Button(label="Conservar solo este")
+        self.merge_button.set_tooltip_text("Conserva el documento seleccionado y envía a la papelera el resto de su grupo")
+        self.merge_button.connect("clicked", self.on_merge_clicked)
+        self.delete_button = Gtk.Button(label="Eliminar")
+        self.delete_button.set_tooltip_text("Envía a la papelera el documento seleccionado")
+        self.delete_button.connect("clicked", self.on_delete_clicked)
+        actions_box.pack_start(self.scan_button, False, False, 0)
+        actions_box.pack_end(self.delete_button, False, False, 0)
+        actions_box.pack_end(self.merge_button, False, False, 0)
+        self.pack_start(actions_box, False, False, 0)
+
+        self.progress_bar = Gtk.ProgressBar()
+        self.progress_bar.set_show_text(True)
+        self.progress_bar.set_text("Pulse Analizar para buscar duplicados")
+        self.pack_start(self.progress_bar, False, False, 0)
+
+        # Grupos: filas padre con el tipo de coincidencia, hijas con cada documento
+        # Columnas: texto, ruta, tamaño, es documento
+        self.store = Gtk.TreeStore(str, str, str, bool)
+        self.tree_view = Gtk.TreeView(model=self.store)
+        self.tree_view.append_column(Gtk.TreeViewColumn("Documento", Gtk.CellRendererText(), text=0))
+        self.tree_view.append_column(Gtk.TreeViewColumn("Tamaño", Gtk.CellRendererText(), text=2))
+        self.tree_view.get_selection().connect("changed", self.on_selection_changed)
+        scroll = Gtk.ScrolledWindow()
+        scroll.set_hexpand(True)
+        scroll.set_vexpand(True)
+        scroll.add(self.tree_view)
+        self.pack_start(scroll, True, True, 0)
+        self.on_selection_changed(self.tree_view.get_selection())
+
+    def on_scan_clicked(self, button):
+        if self.scanner:
+            self.scanner.cancel()
+            return
+        self.store.clear()
+        self.scan_button.set_label("Cancelar")
+        self.scanner = DuplicateScanner(
+            self.preferences.get_list("document-roots"),
+            progress=lambda message, fraction: GLib.idle_add(self.on_progress, message, fraction),
+        )
+        threading.Thread(target=self.scan_thread, args=(self.scanner,), daemon=True).start()
+
+    def scan_thread(self, scanner):
+        # Cualquier fallo (también un proceso del pool que muere) debe
+        # devolver la vista a su estado normal
+        groups, error = [], None
+        try:
+            groups = scanner.run()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            GLib.idle_add(self.on_scan_finished, scanner, groups, error)
+
+    def on_progress(self, message, fraction):
+        self.progress_bar.set_text(message)
+        if fraction is None:
+            self.progress_bar.pulse()
+        else:
+            self.progress_bar.set_fraction(fraction)
+        return False
+
+    def on_scan_finished(self, scanner, groups, error):
+        self.scanner = None
+        self.scan_button.set_label("Analizar")
+        if error:
+            self.progress_bar.set_text(f"Error: {error}")
+        elif scanner.cancelled.is_set():
+            self.progress_bar.set_text("Análisis cancelado")
+            self.progress_bar.set_fraction(0)
+        for group in groups:
+            if group["kind"] == "exact":
+                label = f"Copias idénticas ({len(group['paths'])})"
+            else:
+                label = f"Documentos similares al {group['similarity']:.0%} ({len(group['paths'])})"
+            parent = self.store.append(None, [label, "", "", False])
+            for path in group["paths"]:
+                try:
+                    size = format_size(os.path.getsize(path))
+                except OSError:
+                    size = ""
+                self.store.append(parent, [path, path, size, True])
+        self.tree_view.expand_all()
+        return False
+
+    def on_selection_changed(self, selection):
+        model, tree_iter = selection.get_selected()
+        is_document = tree_iter is not None and model[tree_iter][3]
+        self.merge_button.set_sensitive(is_document)
+        self.delete_button.set_sensitive(is_document)
+
+    def confirm(self, message, detail):
+        dialog = Gtk.MessageDialog(
+            transient_for=self.get_toplevel(),
+            message_type=Gtk.MessageType.QUESTION,
+            buttons=Gtk.ButtonsType.OK_CANCEL,
+            text=message,
+        )
+        dialog.format_secondary_text(detail)
+        response = dialog.run()
+        dialog.destroy()
+        return response == Gtk.ResponseType.OK
+
+    def trash(self, tree_iter):
+        """Envía a la papelera el documento de la fila y lo quita de todos los grupos.
+
+        Un mismo documento puede estar en un grupo de copias idénticas y en
+        uno de similares; si ya no existe, solo se quitan sus filas. Devuelve
+        False si no se pudo eliminar.
+        """
+        path = self.store[tree_iter][1]
+        if os.path.lexists(path):
+            try:
+                Gio.File.new_for_path(path).trash(None)
+            except GLib.Error as e:
+                self.progress_bar.set_text(f"No se pudo eliminar {path}: {e.message}")
+                return False
+        self.remove_rows(path)
+        return True
+
+    def remove_rows(self, path):
+        parent = self.store.get_iter_first()
+        while parent is not None:
+            child = self.store.iter_children(parent)
+            while child is not None:
+                if self.store[child][1] == path:
+                    # remove() deja el iterador en la fila siguiente, o lo invalida si no hay más
+                    if not self.store.remove(child):
+                        child = None
+                else:
+                    child = self.store.iter_next(child)
+            # Un grupo con un solo documento ya no tiene duplicados
+            if self.store.iter_n_children(parent) < 2:
+                if not self.store.remove(parent):
+                    parent = None
+            else:
+                parent = self.store.iter_next(parent)
+
+    def on_merge_clicked(self, button):
+        model, tree_iter = self.tree_view.get_selection().get_selected()
+        if tree_iter is None or not model[tree_iter][3]:
+            return
+        keep = model[tree_iter][1]
+        parent = model.iter_parent(tree_iter)
+        others = []
+        child = model.iter_children(parent)
+        while child is not None:
+            if model[child][1] != keep:
+                others.append(Gtk.TreeRowReference.new(model, model.get_path(child)))
+            child = model.iter_next(child)
+        if not self.confirm("¿Conservar solo este documento?", f"Se enviarán a la papelera {len(others)} copias de:\n{keep}"):
+            return
+        for reference in others:
+            if reference.valid() and not self.trash(model.get_iter(reference.get_path())):
+                break
+
+    def on_delete_clicked(self, button):
+        model, tree_iter = self.tree_view.get_selection().get_selected()
+        if tree_iter is None or not model[tree_iter][3]:
+            return
+        if self.confirm("¿Eliminar este documento?", f"Se enviará a la papelera:\n{model[tree_iter][1]}"):
+            self.trash(tree_iter)
+
+
+if __name__ == "__main__":
+    win = Gtk.Window(title="DexterDuplicates")
+    win.set_default_size(800, 600)
+    win.connect("destroy", Gtk.main_quit)
+
+    # Crear y añadir el widget de duplicados
+    view = DexterDuplicates()
+    win.add(view)
+
+    # Mostrar todo y ejecutar
+    win.show_all()
+    Gtk.main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import html
+import zipfile
+from html.parser import HTMLParser
+from xml.etree import ElementTree
+
+# Formatos de documento que gestiona la aplicación
+DOCUMENT_EXTENSIONS = {".txt", ".html", ".htm", ".py", ".sh", ".md", ".docx", ".xlsx"}
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def iter_documents(roots):
+    """Recorre las carpetas de documentos y devuelve (ruta, os.stat_result) de cada documento.
+
+    Los enlaces simbólicos a ficheros se ignoran y cada fichero (dispositivo,
+    inodo) se devuelve una sola vez, para que un mismo documento no aparezca
+    con dos rutas distintas.
+    """
+    pending = [root for root in roots if os.path.isdir(root)]
+    seen = set()
+    files_seen = set()
+    while pending:
+        folder = pending.pop()
+        real = os.path.realpath(folder)
+        if real in seen:
+            continue
+        seen.add(real)
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            # Ignorar ficheros y carpetas ocultos
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir():
+                    pending.append(entry.path)
+                elif (entry.is_file() and not entry.is_symlink()
+                        and os.path.splitext(entry.name)[1].lower() in DOCUMENT_EXTENSIONS):
+                    st = entry.stat()
+                    if (st.st_dev, st.st_ino) in files_seen:
+                        continue
+                    files_seen.add((st.st_dev, st.st_ino))
+                    yield entry.path, st
+            except OSError:
+                continue
+
+
+def document_root(path, roots):
+    """Devuelve la carpeta de documentos que contiene la ruta, o None"""
+    for root in roots:
+        root = os.path.join(os.path.abspath(root), "")
+        if path.startswith(root):
+            return root.rstrip(os.sep)
+    return None
+
+
+class HTMLTextExtractor(HTMLParser):
+    """Convierte HTML en texto plano conservando los saltos de bloque"""
+
+    BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "section", "article"}
+    SKIP_TAGS = {"script", "style", "head"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self.skip += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self.skip:
+            self.skip -= 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self.skip:
+            self.parts.append(data)
+
+    def get_text(self):
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        text = []
+        for line in lines:
+            # Colapsar líneas vacías consecutivas
+            if line or (text and text[-1]):
+                text.append(line)
+        return "\n".join(text).strip() + "\n"
+
+
+def html_to_text(source):
+    parser = HTMLTextExtractor()
+    parser.feed(source)
+    parser.close()
+    return parser.get_text()
+
+
+def markdown_url(url):
+    # Los enlaces no pueden ejecutar código al abrir el HTML generado
+    return "#" if re.match(r"\s*(javascript|vbscript|data):", url, re.IGNORECASE) else url
+
+
+MARKDOWN_CODE = re.compile(r"`([^`]+)`")
+MARKDOWN_INLINE = [
+    (re.compile(r"!\[([^\]]*)\]\(([^)\s]+)\)"), lambda m: f'<img src="{markdown_url(m.group(2))}" alt="{m.group(1)}">'),
+    (re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)"), lambda m: f'<a href="{markdown_url(m.group(2))}">{m.group(1)}</a>'),
+    (re.compile(r"\*\*(.+?)\*\*|__(.+?)__"), lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>"),
+    (re.compile(r"\*(.+?)\*|\b_(.+?)_\b"), lambda m: f"<em>{m.group(1) or m.group(2)}</em>"),
+]
+MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*$")
+MARKDOWN_LIST = re.compile(r"^\s*(?:([-*+])|(\d+)[.)])\s+(.*)$")
+MARKDOWN_RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+
+
+def markdown_inline(text):
+    """Aplica los estilos en línea; el contenido de `código` se escapa pero no se interpreta"""
+    parts = MARKDOWN_CODE.split(text)
+    for i, part in enumerate(parts):
+        # Las comillas también se escapan: el texto acaba en atributos como href
+        part = html.escape(part, quote=True)
+        if i % 2:
+            parts[i] = f"<code>{part}</code>"
+            continue
+        for pattern, replacement in MARKDOWN_INLINE:
+            part = pattern.sub(replacement, part)
+        parts[i] = part
+    return "".join(parts)
+
+
+def markdown_to_html(text):
+    """Convierte Markdown a HTML.
+
+    Conversor sencillo que cubre encabezados, listas, citas, bloques de código
+    y estilos en línea. No se usa python3-markdown porque deja pasar el HTML
+    del documento tal cual (scripts, enlaces javascript:); aquí todo el texto
+    se escapa y los enlaces pasan por markdown_url.
+    """
+    out = []
+    paragraph = []
+    list_tag = None
+    code = None
+
+    def close_blocks():
+        nonlocal list_tag
+        if paragraph:
+            out.append(f"<p>{markdown_inline(' '.join(paragraph))}</p>")
+            paragraph.clear()
+        if list_tag:
+            out.append(f"</{list_tag}>")
+            list_tag = None
+
+    for line in text.splitlines():
+        if code is not None:
+            if line.strip().startswith("```"):
+                out.append(f"<pre><code>{html.escape(chr(10).join(code))}</code></pre>")
+                code = None
+            else:
+                code.append(line)
+            continue
+        if line.strip().startswith("```"):
+            close_blocks()
+            code = []
+            continue
+        heading = MARKDOWN_HEADING.match(line)
+        item = MARKDOWN_LIST.match(line)
+        if not line.strip():
+            close_blocks()
+        elif MARKDOWN_RULE.match(line):
+            # Antes que las listas: "* * *" es una línea horizontal, no un elemento
+            close_blocks()
+            out.append("<hr>")
+        elif heading:
+            close_blocks()
+            level = len(heading.group(1))
+            out.append(f"<h{level}>{markdown_inline(heading.group(2))}</h{level}>")
+        elif item:
+            tag = "ul" if item.group(1) else "ol"
+            if paragraph or list_tag != tag:
+                close_blocks()
+                out.append(f"<{tag}>")
+                list_tag = tag
+            out.append(f"<li>{markdown_inline(item.group(3))}</li>")
+        elif line.startswith(">"):
+            close_blocks()
+            out.append(f"<blockquote>{markdown_inline(line.lstrip('> '))}</blockquote>")
+        else:
+            if list_tag:
+                close_blocks()
+            paragraph.append(line.strip())
+    if code is not None:
+        out.append(f"<pre><code>{html.escape(chr(10).join(code))}</code></pre>")
+    close_blocks()
+    return "\n".join(out) + "\n"
+
+
+def docx_to_text(path):
+    """Extrae los párrafos de un documento Word (.docx)"""
+    paragraphs = []
+    with zipfile.ZipFile(path) as archive:
+        with archive.open("word/document.xml") as xml:
+            for event, element in ElementTree.iterparse(xml):
+                if element.tag == WORD_NS + "p":
+                    paragraphs.append("".join(node.text or "" for node in element.iter(WORD_NS + "t")))
+                    element.clear()
+    return "\n".join(paragraphs) + "\n"
+
+
+def xlsx_to_text(path):
+    """Extrae las celdas de un libro Excel (.xlsx), una fila por línea separada por tabuladores"""
+    lines = []
+    with zipfile.ZipFile(path) as archive:
+        shared = []
+        if "xl/sharedStrings.xml" in archive.namelist():
+            with archive.open("xl/sharedStrings.xml") as xml:
+                for event, element in ElementTree.iterparse(xml):
+                    if element.tag == SHEET_NS + "si":
+                        shared.append("".join(node.text or "" for node in element.iter(SHEET_NS + "t")))
+                        element.clear()
+        sheets = sorted(
+            (name for name in archive.namelist() if name.startswith("xl/worksheets/sheet") and name.endswith(".xml")),
+            key=lambda name: int("".join(c for c in name if c.isdigit()) or 0),
+        )
+        for sheet in sheets:
+            with archive.open(sheet) as xml:
+                for event, element in ElementTree.iterparse(xml):
+                    if element.tag != SHEET_NS + "row":
+                        continue
+                    cells = []
+                    for cell in element.iter(SHEET_NS + "c"):
+                        kind = cell.get("t")
+                        if kind == "inlineStr":
+                            cells.append("".join(node.text or "" for node in cell.iter(SHEET_NS + "t")))
+                            continue
+                        value = cell.find(SHEET_NS + "v")
+                        if value is None or value.text is None:
+                            cells.append("")
+                        elif kind == "s":
+                            index = int(value.text)
+                            cells.append(shared[index] if index < len(shared) else "")
+                        else:
+                            cells.append(value.text)
+                    lines.append("\t".join(cells).rstrip("\t"))
+                    element.clear()
+    return "\n".join(lines) + "\n"
+
+
+def extract_text(path):
+    """Devuelve el contenido textual de un documento según su formato"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".docx":
+        return docx_to_text(path)
+    if extension == ".xlsx":
+        return xlsx_to_text(path)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    if extension in (".html", ".htm"):
+        return html_to_text(text)
+    return text
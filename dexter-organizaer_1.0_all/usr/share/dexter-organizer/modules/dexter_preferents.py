@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import threading
+import weakref
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk, GLib, GObject
+
+# Rutas de configuración y caché de la aplicación
+CONFIG_DIR = os.path.join(GLib.get_user_config_dir(), "dexter-organizer")
+CACHE_DIR = os.path.join(GLib.get_user_cache_dir(), "dexter-organizer")
+PREFERENCES_FILE = os.path.join(CONFIG_DIR, "preferences.json")
+
+# Segundos que se agrupan las escrituras antes de volcarlas a disco
+FLUSH_DELAY = 1.5
+
+
+def default_documents_dir():
+    """Devuelve la carpeta de documentos del usuario"""
+    documents = GLib.get_user_special_dir(GLib.UserDirectory.DIRECTORY_DOCUMENTS)
+    return documents or os.path.expanduser("~")
+
+
+# Valores por defecto: también fijan el tipo de cada preferencia
+DEFAULTS = {
+    "theme": "light",
+    "font-family": "Monospace",
+    "font-size": 11,
+    "document-roots": [default_documents_dir()],
+    "backup-enabled": False,
+    "backup-interval": 24,
+    "backup-dir": os.path.join(os.path.expanduser("~"), "Dexter-Backups"),
+}
+
+
+def write_atomic(path, data):
+    """Escribe el fichero completo en uno temporal y lo renombra encima del original.
+
+    El temporal lleva el proceso y el hilo en el nombre: dos escrituras
+    simultáneas del mismo fichero nunca comparten temporal.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    mode = "wb" if isinstance(data, bytes) else "w"
+    try:
+        with open(tmp_path, mode) as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class DexterPreferences(GObject.GObject):
+    """Almacén de preferencias en memoria.
+
+    El fichero se lee una sola vez al arrancar; las lecturas posteriores salen
+    del diccionario en memoria. Cada cambio emite "changed::<clave>" y las
+    escrituras se agrupan y se vuelcan a disco desde un hilo en segundo plano.
+    """
+
+    __gsignals__ = {
+        "changed": (GObject.SignalFlags.RUN_FIRST | GObject.SignalFlags.DETAILED, None, (str,)),
+    }
+
+    def __init__(self, path=PREFERENCES_FILE):
+        super().__init__()
+        self.path = path
+        self._values = dict(DEFAULTS)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._wake = threading.Event()
+        self._closed = False
+        self.load()
+        self._writer = threading.Thread(target=self._writer_loop, name="dexter-preferences", daemon=True)
+        self._writer.start()
+
+    def load(self):
+        """Carga las preferencias guardadas, ignorando claves desconocidas o de tipo incorrecto"""
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(stored, dict):
+            return
+        for key, value in stored.items():
+            if key in DEFAULTS and isinstance(value, type(DEFAULTS[key])):
+                self._values[key] = value
+
+    # Lectura tipada (nunca tocan el disco)
+    def get(self, key):
+        return self._values[key]
+
+    def get_string(self, key):
+        return str(self._values[key])
+
+    def get_int(self, key):
+        return int(self._values[key])
+
+    def get_bool(self, key):
+        return bool(self._values[key])
+
+    def get_list(self, key):
+        return list(self._values[key])
+
+    def set(self, key, value):
+        """Cambia una preferencia, avisa a los interesados y programa el guardado"""
+        if key not in DEFAULTS:
+            raise KeyError(key)
+        if not isinstance(value, type(DEFAULTS[key])):
+            raise TypeError(f"La preferencia '{key}' debe ser de tipo {type(DEFAULTS[key]).__name__}")
+        if self._values.get(key) == value:
+            return
+        with self._lock:
+            self._values[key] = value
+            self._dirty = True
+        self._wake.set()
+        self.emit("changed::" + key, key)
+
+    def reset(self, key):
+        """Restaura el valor por defecto de una preferencia"""
+        self.set(key, DEFAULTS[key])
+
+    def flush(self):
+        """Vuelca a disco los cambios pendientes en el hilo actual"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._values, indent=2, ensure_ascii=False)
+            self._dirty = False
+        try:
+            write_atomic(self.path, data)
+        except OSError as e:
+            print(f"Advertencia: No se pudieron guardar las preferencias: {e}")
+
+    def close(self):
+        """Detiene el hilo de escritura y guarda lo pendiente"""
+        self._closed = True
+        self._wake.set()
+        self._writer.join(timeout=5)
+        self.flush()
+
+    def _writer_loop(self):
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            # Esperar a que dejen de llegar cambios para escribir una sola vez
+            while not self._closed and self._wake.wait(FLUSH_DELAY):
+                self._wake.clear()
+            self.flush()
+
+
+_preferences = None
+
+
+def get_preferences():
+    """Devuelve la instancia compartida de las preferencias"""
+    global _preferences
+    if _preferences is None:
+        _preferences = DexterPreferences()
+    return _preferences
+
+
+def on_preference_changed(preferences, key, view_ref):
+    # Referencia débil: las preferencias no deben mantener viva la vista
+    view = view_ref()
+    if view is not None:
+        view.update_widget(key)
+
+
+class DexterPreferencesView(Gtk.Box):
+    def __init__(self, preferences=None):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=20)
+        self.preferences = preferences or get_preferences()
+        # Clave -> (control, manejador de su señal) para bloquearlo al actualizarlo
+        self.widget_handlers = {}
+        self.init_ui()
+
+        # Los controles reflejan los cambios hechos desde otras partes de la aplicación
+        view_ref = weakref.ref(self)
+        self.preference_handlers = [
+            self.preferences.connect(f"changed::{key}", on_preference_changed, view_ref)
+            for key in ("font-family", "font-size", "theme", "document-roots",
+                        "backup-enabled", "backup-interval", "backup-dir")
+        ]
+        self.connect("destroy", self.on_destroy)
+
+    def init_ui(self):
+        self.set_border_width(20)
+        self.set_hexpand(True)
+        self.set_vexpand(True)
+        prefs = self.preferences
+
+        title_label = Gtk.Label(label="Preferencias")
+        title_label.set_halign(Gtk.Align.START)
+        title_label.get_style_context().add_class("start-title")
+        self.pack_start(title_label, False, False, 0)
+
+        grid = Gtk.Grid()
+        grid.set_row_spacing(12)
+        grid.set_column_spacing(20)
+        self.pack_start(grid, False, False, 0)
+        row = 0
+
+        # Tipografía del editor
+        font_button = Gtk.FontButton()
+        font_button.set_font(f"{prefs.get_string('font-family')} {prefs.get_int('font-size')}")
+        handler = font_button.connect("font-set", self.on_font_set)
+        self.widget_handlers["font-family"] = self.widget_handlers["font-size"] = (font_button, handler)
+        row = self.add_row(grid, row, "Fuente del editor", font_button)
+
+        # Tema
+        dark_switch = Gtk.Switch()
+        dark_switch.set_halign(Gtk.Align.START)
+        dark_switch.set_active(prefs.get_string("theme") == "dark")
+        handler = dark_switch.connect("notify::active", lambda w, p: prefs.set("theme", "dark" if w.get_active() else "light"))
+        self.widget_handlers["theme"] = (dark_switch, handler)
+        row = self.add_row(grid, row, "Tema oscuro", dark_switch)
+
+        # Carpetas de documentos
+        roots_store = Gtk.ListStore(str)
+        self.roots_store = roots_store
+        self.update_roots()
+        roots_view = Gtk.TreeView(model=roots_store)
+        roots_view.set_headers_visible(False)
+        roots_view.append_column(Gtk.TreeViewColumn("Carpeta", Gtk.CellRendererText(), text=0))
+        self.roots_view = roots_view
+        roots_scroll = Gtk.ScrolledWindow()
+        roots_scroll.set_min_content_height(90)
+        roots_scroll.set_hexpand(True)
+        roots_scroll.add(roots_view)
+        roots_buttons = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        add_root = Gtk.Button(label="Añadir")
+        add_root.connect("clicked", self.on_add_root)
+        remove_root = Gtk.Button(label="Quitar")
+        remove_root.connect("clicked", self.on_remove_root)
+        roots_buttons.pack_start(add_root, False, False, 0)
+        roots_buttons.pack_start(remove_root, False, False, 0)
+        roots_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        roots_box.pack_start(roots_scroll, True, True, 0)
+        roots_box.pack_start(roots_buttons, False, False, 0)
+        row = self.add_row(grid, row, "Carpetas de documentos", roots_box)
+
+        # Copias de seguridad
+        backup_switch = Gtk.Switch()
+        backup_switch.set_halign(Gtk.Align.START)
+        backup_switch.set_active(prefs.get_bool("backup-enabled"))
+        handler = backup_switch.connect("notify::active", lambda w, p: prefs.set("backup-enabled", w.get_active()))
+        self.widget_handlers["backup-enabled"] = (backup_switch, handler)
+        row = self.add_row(grid, row, "Copias automáticas", backup_switch)
+
+        interval_spin = Gtk.SpinButton.new_with_range(1, 24 * 30, 1)
+        interval_spin.set_halign(Gtk.Align.START)
+        interval_spin.set_value(prefs.get_int("backup-interval"))
+        handler = interval_spin.connect("value-changed", lambda w: prefs.set("backup-interval", w.get_value_as_int()))
+        self.widget_handlers["backup-interval"] = (interval_spin, handler)
+        row = self.add_row(grid, row, "Intervalo de copia (horas)", interval_spin)
+
+        backup_dir = Gtk.FileChooserButton(title="Carpeta de copias", action=Gtk.FileChooserAction.SELECT_FOLDER)
+        if os.path.isdir(prefs.get_string("backup-dir")):
+            backup_dir.set_filename(prefs.get_string("backup-dir"))
+        handler = backup_dir.connect("file-set", lambda w: w.get_filename() and prefs.set("backup-dir", w.get_filename()))
+        self.widget_handlers["backup-dir"] = (backup_dir, handler)
+        row = self.add_row(grid, row, "Carpeta de copias", backup_dir)
+
+    def add_row(self, grid, row, label, widget):
+        """Añade una fila etiqueta/control a la rejilla"""
+        row_label = Gtk.Label(label=label)
+        row_label.set_halign(Gtk.Align.START)
+        row_label.set_valign(Gtk.Align.START)
+        grid.attach(row_label, 0, row, 1, 1)
+        grid.attach(widget, 1, row, 1, 1)
+        return row + 1
+
+    def update_widget(self, key):
+        """Muestra en su control el valor actual de una preferencia.
+
+        El manejador del control se bloquea mientras tanto para que el cambio
+        no vuelva a escribirse en las preferencias.
+        """
+        prefs = self.preferences
+        if key == "document-roots":
+            self.update_roots()
+            return
+        widget, handler = self.widget_handlers[key]
+        widget.handler_block(handler)
+        try:
+            if key in ("font-family", "font-size"):
+                widget.set_font(f"{prefs.get_string('font-family')} {prefs.get_int('font-size')}")
+            elif key == "theme":
+                widget.set_active(prefs.get_string("theme") == "dark")
+            elif key == "backup-enabled":
+                widget.set_active(prefs.get_bool("backup-enabled"))
+            elif key == "backup-interval":
+                widget.set_value(prefs.get_int("backup-interval"))
+            elif key == "backup-dir" and os.path.isdir(prefs.get_string("backup-dir")):
+                widget.set_filename(prefs.get_string("backup-dir"))
+        finally:
+            widget.handler_unblock(handler)
+
+    def update_roots(self):
+        self.roots_store.clear()
+        for root in self.preferences.get_list("document-roots"):
+            self.roots_store.append([root])
+
+    def on_destroy(self, widget):
+        for handler in self.preference_handlers:
+            self.preferences.disconnect(handler)
+        self.preference_handlers = []
+
+    def on_font_set(self, button):
+        from gi.repository import Pango
+        description = Pango.FontDescription.from_string(button.get_font())
+        self.preferences.set("font-family", description.get_family() or DEFAULTS["font-family"])
+        size = description.get_size() // Pango.SCALE
+        if size > 0:
+            self.preferences.set("font-size", size)
+
+    def on_add_root(self, button):
+        dialog = Gtk.FileChooserDialog(
+            title="Seleccionar carpeta de documentos",
+            transient_for=self.get_toplevel(),
+            action=Gtk.FileChooserAction.SELECT_FOLDER,
+        )
+        dialog.add_buttons("Cancelar", Gtk.ResponseType.CANCEL, "Añadir", Gtk.ResponseType.OK)
+        if dialog.run() == Gtk.ResponseType.OK:
+            folder = dialog.get_filename()
+            roots = self.preferences.get_list("document-roots")
+            if folder and folder not in roots:
+                # La lista se actualiza al recibir "changed::document-roots"
+                self.preferences.set("document-roots", roots + [folder])
+        dialog.destroy()
+
+    def on_remove_root(self, button):
+        model, tree_iter = self.roots_view.get_selection().get_selected()
+        if tree_iter is None:
+            return
+        folder = model[tree_iter][0]
+        roots = [root for root in self.preferences.get_list("document-roots") if root != folder]
+        self.preferences.set("document-roots", roots)
+
+
+if __name__ == "__main__":
+    win = Gtk.Window(title="DexterPreferences")
+    win.set_default_size(800, 600)
+    win.connect("destroy", Gtk.main_quit)
+
+    # Crear y añadir el widget de preferencias
+    view = DexterPreferencesView()
+    win.add(view)
+
+    # Mostrar todo y ejecutar
+    win.show_all()
+    Gtk.main()
+    get_preferences().close()
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import heapq
+import threading
+import time
+from array import array
+from collections import defaultdict
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk, Gdk, GLib, Pango
+
+from modules.dexter_file_manager import iter_documents
+
+# Número máximo de resultados mostrados
+MAX_RESULTS = 50
+# Segundos tras los que el índice se reconstruye al volver a abrir el modo
+INDEX_MAX_AGE = 60
+# Puntuación de cada fragmento según dónde aparece: el nombre empieza por él,
+# está en el nombre, está en la ruta, está en el nombre con un error o sus
+# letras aparecen en orden en el nombre. Cada nivel supera al siguiente; las
+# cotas de la búsqueda dependen de ese orden.
+PREFIX_BONUS = 12.0
+STEM_BONUS = 8.0
+PATH_BONUS = 4.0
+FUZZY_BONUS = 3.0
+SUBSEQUENCE_BONUS = 2.0
+MISSING_PENALTY = -2.0
+COVERAGE_WEIGHT = 10.0
+LENGTH_PENALTY = 0.01
+# Las listas de aparición con al menos 1/BITMAP_RATIO de las rutas se guardan
+# como mapas de bits (enteros de Python): intersecarlas cuesta microsegundos
+BITMAP_RATIO = 64
+# Listas dispersas convertidas a mapa de bits que se conservan entre consultas
+BITMAP_CACHE_SIZE = 512
+# Si la lista más rara tiene como mucho tantas rutas, el resto de listas
+# dispersas no se convierten: basta con comprobar los candidatos
+SMALL_POSTING = 256
+
+# Posiciones de los bits activos de cada byte, para recorrer mapas de bits
+BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+NONZERO = bytes([0] + [1] * 255)
+
+
+def grams(text, sizes):
+    """Subcadenas de las longitudes indicadas que aparecen en el texto"""
+    found = set()
+    for size in sizes:
+        found.update(text[i:i + size] for i in range(len(text) - size + 1))
+    return found
+
+
+def fragment_trigrams(fragment):
+    return {fragment[i:i + 3] for i in range(len(fragment) - 2)}
+
+
+def typo_variants(fragment):
+    """Formas del fragmento con un error, como pares (antes, después) del hueco.
+
+    El hueco es una letra cualquiera (letra cambiada o sobrante); sin hueco,
+    el texto es la unión de ambas partes (letra omitida o transpuesta).
+    """
+    variants = set()
+    for i in range(len(fragment)):
+        variants.add((fragment[:i], fragment[i + 1:], True))
+        variants.add((fragment[:i], fragment[i:], True))
+        variants.add((fragment[:i] + fragment[i + 1:], "", False))
+        if i + 1 < len(fragment):
+            variants.add((fragment[:i] + fragment[i + 1] + fragment[i] + fragment[i + 2:], "", False))
+    return sorted(variants)
+
+
+def fuzzy_pattern(fragment):
+    """Expresión que reconoce el fragmento con un error: letra cambiada, sobrante, omitida o transpuesta"""
+    return re.compile("|".join(
+        re.escape(before) + ("." if gap else "") + re.escape(after)
+        for before, after, gap in typo_variants(fragment)
+    ))
+
+
+def is_subsequence(fragment, text):
+    """Comprueba si los caracteres del fragmento aparecen en orden dentro del texto"""
+    position = 0
+    for char in fragment:
+        position = text.find(char, position) + 1
+        if not position:
+            return False
+    return True
+
+
+def ids_to_bitmap(ids, size):
+    data = bytearray((size + 7) // 8)
+    for doc_id in ids:
+        data[doc_id >> 3] |= 1 << (doc_id & 7)
+    return int.from_bytes(data, "little")
+
+
+def bitmap_ids(bitmap):
+    """Identificadores de los bits activos, de menor a mayor, calculados a medida que se piden"""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    flags = data.translate(NONZERO)
+    position = flags.find(1)
+    while position >= 0:
+        base = position << 3
+        for bit in BYTE_BITS[data[position]]:
+            yield base + bit
+        position = flags.find(1, position + 1)
+
+
+class PostingLists:
+    """Listas de aparición de subcadenas cortas (n-gramas).
+
+    Las listas frecuentes se guardan como mapas de bits; las demás en formato
+    CSR: un diccionario de n-grama a posición, un array de desplazamientos y
+    un único array con los identificadores de ruta.
+    """
+
+    def __init__(self, postings, size, sizes):
+        self.size = size
+        self.sizes = sizes
+        self.everything = (1 << size) - 1
+        self.counts = {}
+        self.bitmaps = {}
+        self.slots = {}
+        self.offsets = array("I", [0])
+        self.ids = array("I")
+        self.cache = {}
+        threshold = max(1, size // BITMAP_RATIO)
+        for key, posting in postings.items():
+            self.counts[key] = len(posting)
+            if len(posting) >= threshold:
+                self.bitmaps[key] = ids_to_bitmap(posting, size)
+            else:
+                self.slots[key] = len(self.offsets) - 1
+                self.ids.extend(posting)
+                self.offsets.append(len(self.ids))
+
+    def count(self, key):
+        return self.counts.get(key, 0)
+
+    def required(self, fragment):
+        """N-gramas del índice que contiene cualquier texto que incluya el fragmento"""
+        size = max(size for size in self.sizes if size <= len(fragment))
+        return grams(fragment, (size,))
+
+    def bitmap(self, key):
+        bitmap = self.bitmaps.get(key)
+        if bitmap is not None:
+            return bitmap
+        bitmap = self.cache.get(key)
+        if bitmap is None:
+            slot = self.slots.get(key)
+            if slot is None:
+                return 0
+            if len(self.cache) >= BITMAP_CACHE_SIZE:
+                self.cache.clear()
+            bitmap = self.cache[key] = ids_to_bitmap(self.ids[self.offsets[slot]:self.offsets[slot + 1]], self.size)
+        return bitmap
+
+    def intersect(self, keys):
+        """Mapa de bits de las rutas que tienen todos los n-gramas (o un superconjunto pequeño)"""
+        keys = sorted(keys, key=self.count)
+        if not keys:
+            return self.everything
+        result = self.bitmap(keys[0])
+        small = self.count(keys[0]) <= SMALL_POSTING
+        for key in keys[1:]:
+            if not result:
+                break
+            if key in self.bitmaps or not small:
+                result &= self.bitmap(key)
+        return result
+
+    def search(self, fragment):
+        return self.intersect(self.required(fragment))
+
+
+class TrigramIndex:
+    """Índice de n-gramas de rutas de documentos, relativas a su carpeta raíz.
+
+    Hay tres índices: trigramas y letras de la ruta relativa completa;
+    trigramas, bigramas y letras del nombre del fichero sin extensión; y el
+    comienzo de ese nombre. Los identificadores se asignan por longitud de
+    ruta, así que se recorren primero las rutas cortas (las mejor puntuadas a
+    igualdad). Los candidatos se reparten en niveles según la puntuación
+    máxima que pueden alcanzar, calculados con operaciones sobre los mapas de
+    bits, y la búsqueda para en cuanto ninguna ruta restante puede superar a
+    los resultados ya encontrados.
+    """
+
+    def __init__(self, documents=()):
+        # documents: iterable de (ruta completa, carpeta raíz)
+        entries = []
+        for path, root in documents:
+            relative = os.path.relpath(path, root) if root else path
+            entries.append((len(relative), relative.lower(), path))
+        entries.sort()
+        self.paths = []
+        self.lowered = []
+        self.stems = []
+        path_postings = defaultdict(lambda: array("I"))
+        stem_postings = defaultdict(lambda: array("I"))
+        start_postings = defaultdict(lambda: array("I"))
+        for doc_id, (length, lowered, path) in enumerate(entries):
+            stem = os.path.splitext(os.path.basename(lowered))[0]
+            self.paths.append(path)
+            self.lowered.append(lowered)
+            self.stems.append(stem)
+            for gram in grams(lowered, (1, 3)):
+                path_postings[gram].append(doc_id)
+            for gram in grams(stem, (1, 2, 3)):
+                stem_postings[gram].append(doc_id)
+            for gram in {stem[:1], stem[:2], stem[:3]}:
+                start_postings[gram].append(doc_id)
+        size = len(entries)
+        self.path_index = PostingLists(path_postings, size, (1, 3))
+        self.stem_index = PostingLists(stem_postings, size, (1, 2, 3))
+        self.start_index = PostingLists(start_postings, size, (1, 2, 3))
+
+    @classmethod
+    def from_roots(cls, roots):
+        roots = [os.path.abspath(root) for root in roots]
+
+        def documents():
+            for root in roots:
+                for path, st in iter_documents([root]):
+                    yield path, root
+        return cls(documents())
+
+    def __len__(self):
+        return len(self.paths)
+
+    def score(self, doc_id, query, coverage=None):
+        lowered = self.lowered[doc_id]
+        stem = self.stems[doc_id]
+        if coverage is None:
+            trigrams_found = sum(1 for trigram in query.trigrams if trigram in lowered)
+            coverage = trigrams_found / len(query.trigrams) if query.trigrams else 1.0
+        score = COVERAGE_WEIGHT * coverage
+        for fragment, pattern in zip(query.fragments, query.patterns):
+            position = stem.find(fragment)
+            if position == 0:
+                score += PREFIX_BONUS
+            elif position > 0:
+                score += STEM_BONUS
+            elif fragment in lowered:
+                score += PATH_BONUS
+            elif pattern is not None and pattern.search(stem):
+                score += FUZZY_BONUS
+            elif is_subsequence(fragment, stem):
+                score += SUBSEQUENCE_BONUS
+            else:
+                score += MISSING_PENALTY
+        # A igualdad, preferir rutas más cortas
+        return score - LENGTH_PENALTY * len(lowered)
+
+    def levels(self, candidates, fragments=(), trigrams=(), weight=0.0):
+        """Reparte los candidatos según la puntuación máxima que pueden alcanzar.
+
+        Cada fragmento que puede estar en el nombre suma STEM_BONUS - PATH_BONUS
+        y el doble si además puede empezarlo; cada trigrama de `trigrams` que
+        está en la ruta suma `weight`. Devuelve [(puntos extra, mapa de bits)]
+        de mayor a menor.
+        """
+        step = STEM_BONUS - PATH_BONUS
+        features = []
+        for fragment in fragments:
+            in_stem = self.stem_index.search(fragment)
+            starts = self.start_index.bitmap(fragment[:3]) & in_stem
+            features.append((((2 * step, starts), (step, in_stem & ~starts)), ~in_stem))
+        for trigram in trigrams:
+            present = self.path_index.bitmap(trigram)
+            features.append((((weight, present),), ~present))
+        levels = {0.0: candidates}
+        for options, outside in features:
+            split = {}
+            for value, bitmap in levels.items():
+                for extra, feature in options + ((0.0, outside),):
+                    part = bitmap & feature
+                    if part:
+                        split[value + extra] = split.get(value + extra, 0) | part
+            levels = split
+        return sorted(levels.items(), key=lambda level: level[0], reverse=True)
+
+    def rank(self, candidates, best, seen, limit, max_score, query, required=(), coverage=None, pattern=None):
+        """Añade a `best` (montículo de tamaño `limit`) los mejores candidatos.
+
+        `candidates` va en orden de identificador, es decir, de longitud de
+        ruta; `max_score` es la puntuación máxima posible de estos candidatos
+        sin contar la penalización por longitud, de modo que en cuanto el
+        montículo está lleno y la cota del candidato no lo mejora, el resto
+        tampoco. Se descartan los candidatos que no contienen todos los textos
+        de `required` o cuyo nombre no reconoce `pattern`.
+        """
+        lowered = self.lowered
+        for doc_id in candidates:
+            if len(best) == limit and best[0][0] >= max_score - LENGTH_PENALTY * len(lowered[doc_id]):
+                return
+            if doc_id in seen:
+                continue
+            path = lowered[doc_id]
+            if required and not all(text in path for text in required):
+                continue
+            if pattern is not None and not pattern.search(self.stems[doc_id]):
+                continue
+            seen.add(doc_id)
+            item = (self.score(doc_id, query, coverage), -doc_id)
+            if len(best) < limit:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+
+    def search(self, text, limit=MAX_RESULTS):
+        """Devuelve hasta `limit` rutas completas ordenadas por relevancia"""
+        query = Query(text)
+        if not query.fragments or not self.paths:
+            return []
+        best = []
+        seen = set()
+        self.rank_exact(query, best, seen, limit)
+        if len(best) < limit:
+            self.rank_typos(query, best, seen, limit)
+        best.sort(reverse=True)
+        return [self.paths[-doc_id] for score, doc_id in best]
+
+    def rank_exact(self, query, best, seen, limit):
+        """Rutas que contienen todos los fragmentos de la consulta"""
+        candidates = self.path_index.intersect(set().union(*(
+            self.path_index.required(fragment) for fragment in query.fragments
+        )))
+        base = COVERAGE_WEIGHT + PATH_BONUS * len(query.fragments)
+        for extra, bitmap in self.levels(candidates, query.fragments):
+            if len(best) == limit and best[0][0] >= base + extra:
+                return
+            self.rank(bitmap_ids(bitmap), best, seen, limit, base + extra, query, query.fragments, 1.0)
+
+    def typo_candidates(self, fragment):
+        """Rutas cuyo nombre puede contener el fragmento con un error"""
+        result = 0
+        for before, after, gap in typo_variants(fragment):
+            pieces = (before, after) if gap else (before + after,)
+            result |= self.stem_index.intersect(set().union(*(
+                self.stem_index.required(piece) for piece in pieces if piece
+            )))
+        return result
+
+    def rank_typos(self, query, best, seen, limit):
+        """Rutas con un error tipográfico en uno de los fragmentos.
+
+        El resto de fragmentos debe aparecer entero y el nombre debe reconocer
+        el fragmento erróneo con su patrón. Los niveles tienen en cuenta dónde
+        pueden estar los demás fragmentos y cuántos trigramas del erróneo
+        conserva la ruta.
+        """
+        for position, fragment in enumerate(query.fragments):
+            pattern = query.patterns[position]
+            if pattern is None:
+                continue
+            others = query.fragments[:position] + query.fragments[position + 1:]
+            candidates = self.typo_candidates(fragment)
+            if others and candidates:
+                candidates &= self.path_index.intersect(set().union(*(
+                    self.path_index.required(other) for other in others
+                )))
+            if not candidates:
+                continue
+            present = set().union(*(fragment_trigrams(other) for other in others))
+            own = sorted(fragment_trigrams(fragment) - present)
+            weight = COVERAGE_WEIGHT / len(query.trigrams)
+            # El fragmento erróneo no está entero en el nombre: como mucho FUZZY_BONUS
+            base = FUZZY_BONUS + PATH_BONUS * len(others) + weight * len(present)
+            for extra, bitmap in self.levels(candidates, others, own, weight):
+                if len(best) == limit and best[0][0] >= base + extra:
+                    break
+                self.rank(bitmap_ids(bitmap), best, seen, limit, base + extra, query, others, pattern=pattern)
+
+
+class Query:
+    """Consulta preparada: fragmentos, trigramas y patrones de error tipográfico"""
+
+    def __init__(self, text):
+        self.fragments = text.lower().split()
+        self.trigrams = sorted(set().union(*(fragment_trigrams(fragment) for fragment in self.fragments)))
+        self.patterns = [fuzzy_pattern(fragment) if len(fragment) > 3 else None for fragment in self.fragments]
+
+
+class DexterQuickOpen:
+    """Modo "ir a documento" (Ctrl+P) del buscador de la cabecera"""
+
+    def __init__(self, search_entry, preferences, on_open):
+        self.search_entry = search_entry
+        self.preferences = preferences
+        self.on_open = on_open
+        self.active = False
+        self.index = None
+        self.built_at = 0.0
+        self.building = False
+        self.rebuild_pending = False
+        self.placeholder = search_entry.get_placeholder_text()
+
+        # Popover de resultados bajo el buscador
+        self.popover = Gtk.Popover.new(search_entry)
+        self.popover.set_modal(False)
+        self.popover.set_position(Gtk.PositionType.BOTTOM)
+        self.results = Gtk.ListBox()
+        self.results.set_selection_mode(Gtk.SelectionMode.BROWSE)
+        self.results.connect("row-activated", lambda listbox, row: self.open_row(row))
+        scroll = Gtk.ScrolledWindow()
+        scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        scroll.set_min_content_width(500)
+        scroll.set_max_content_height(400)
+        scroll.set_propagate_natural_height(True)
+        scroll.add(self.results)
+        self.popover.add(scroll)
+
+        search_entry.connect("changed", self.on_changed)
+        search_entry.connect("activate", self.on_activate)
+        search_entry.connect("key-press-event", self.on_key_press)
+        # El índice se reconstruye cuando cambian las carpetas de documentos
+        preferences.connect("changed::document-roots", lambda prefs, key: self.rebuild())
+
+    def enter(self):
+        """Activa el modo de búsqueda por nombre"""
+        self.active = True
+        self.search_entry.set_placeholder_text("Ir a documento...")
+        self.search_entry.set_icon_from_icon_name(Gtk.EntryIconPosition.PRIMARY, "document-open-symbolic")
+        self.search_entry.set_text("")
+        self.search_entry.grab_focus()
+        # Se sigue usando el índice anterior mientras se construye el nuevo
+        if self.index is None or time.monotonic() - self.built_at > INDEX_MAX_AGE:
+            self.rebuild()
+
+    def leave(self):
+        """Vuelve al modo de búsqueda normal"""
+        self.active = False
+        self.popover.popdown()
+        self.search_entry.set_placeholder_text(self.placeholder)
+        self.search_entry.set_icon_from_icon_name(Gtk.EntryIconPosition.PRIMARY, None)
+        self.search_entry.set_text("")
+
+    def rebuild(self):
+        """Construye el índice en segundo plano"""
+        if self.building:
+            self.rebuild_pending = True
+            return
+        self.building = True
+        roots = self.preferences.get_list("document-roots")
+        threading.Thread(target=self.build_thread, args=(roots,), daemon=True).start()
+
+    def build_thread(self, roots):
+        index = None
+        error = None
+        try:
+            index = TrigramIndex.from_roots(roots)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            GLib.idle_add(self.on_index_built, index, error)
+
+    def on_index_built(self, index, error=None):
+        self.building = False
+        if index is not None:
+            self.index = index
+            self.built_at = time.monotonic()
+        elif self.active:
+            self.search_entry.set_placeholder_text(f"No se pudieron indexar los documentos: {error}")
+        if self.rebuild_pending:
+            self.rebuild_pending = False
+            self.rebuild()
+        if self.active:
+            self.on_changed(self.search_entry)
+        return False
+
+    def on_changed(self, entry):
+        if not self.active:
+            return
+        query = entry.get_text()
+        for child in self.results.get_children():
+            self.results.remove(child)
+        if not query.strip() or self.index is None:
+            self.popover.popdown()
+            return
+        for path in self.index.search(query):
+            self.results.add(self.build_row(path))
+        first = self.results.get_row_at_index(0)
+        if first is None:
+            self.popover.popdown()
+            return
+        self.results.select_row(first)
+        self.results.show_all()
+        self.popover.popup()
+
+    def build_row(self, path):
+        row = Gtk.ListBoxRow()
+        row.path = path
+        row_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        row_box.set_margin_start(8)
+        row_box.set_margin_end(8)
+        row_box.set_margin_top(4)
+        row_box.set_margin_bottom(4)
+        name_label = Gtk.Label()
+        name_label.set_markup(f"<b>{GLib.markup_escape_text(os.path.basename(path))}</b>")
+        name_label.set_halign(Gtk.Align.START)
+        folder_label = Gtk.Label(label=os.path.dirname(path))
+        folder_label.set_halign(Gtk.Align.START)
+        folder_label.set_ellipsize(Pango.EllipsizeMode.END)
+        folder_label.get_style_context().add_class("dim-label")
+        row_box.pack_start(name_label, False, False, 0)
+        row_box.pack_start(folder_label, False, False, 0)
+        row.add(row_box)
+        return row
+
+    def open_row(self, row):
+        path = row.path
+        if not os.path.exists(path):
+            # El índice está desfasado: se quita el resultado y se reconstruye
+            self.results.remove(row)
+            self.rebuild()
+            return
+        self.leave()
+        self.on_open(path)
+
+    def on_activate(self, entry):
+        if self.active:
+            row = self.results.get_selected_row()
+            if row is not None:
+                self.open_row(row)
+
+    def on_key_press(self, entry, event):
+        if not self.active:
+            return False
+        if event.keyval == Gdk.KEY_Escape:
+            self.leave()
+            return True
+        if event.keyval in (Gdk.KEY_Down, Gdk.KEY_Up):
+            row = self.results.get_selected_row()
+            if row is None:
+                return True
+            step = 1 if event.keyval == Gdk.KEY_Down else -1
+            target = self.results.get_row_at_index(row.get_index() + step)
+            if target is not None:
+                self.results.select_row(target)
+            return True
+        return False
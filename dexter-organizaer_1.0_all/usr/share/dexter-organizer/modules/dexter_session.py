@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import threading
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import GLib
+
+from modules.dexter_preferents import CONFIG_DIR, write_atomic
+
+SESSION_FILE = os.path.join(CONFIG_DIR, "session.json")
+SESSION_VERSION = 1
+# Cada cuántos segundos se guarda la sesión mientras la aplicación está abierta
+AUTOSAVE_INTERVAL = 60
+
+
+def empty_session():
+    return {
+        "version": SESSION_VERSION,
+        "module": "start",
+        "active": None,
+        # Documentos abiertos: [ruta, posición del cursor, desplazamiento vertical]
+        "documents": [],
+        "search": "",
+        "sidebar": -1,
+    }
+
+
+class DexterSession:
+    """Guarda y recupera el estado de trabajo entre ejecuciones.
+
+    El estado se guarda en un JSON compacto al salir y periódicamente, solo
+    cuando ha cambiado desde la última escritura. Las escrituras no se pisan:
+    cada una toma el estado más reciente pendiente y solo escribe una a la vez,
+    así que un autoguardado lento nunca sobrescribe el guardado de salida.
+    """
+
+    def __init__(self, path=SESSION_FILE):
+        self.path = path
+        self.last_saved = None
+        self.autosave_id = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending = None
+
+    def load(self):
+        """Devuelve la sesión guardada, o una vacía si no existe o no es válida"""
+        session = empty_session()
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return session
+        if not isinstance(stored, dict) or stored.get("version") != SESSION_VERSION:
+            return session
+        for key, value in session.items():
+            if isinstance(stored.get(key), type(value)) or (key == "active" and isinstance(stored.get(key), str)):
+                session[key] = stored[key]
+        session["documents"] = [
+            entry for entry in session["documents"]
+            if isinstance(entry, list) and len(entry) == 3 and isinstance(entry[0], str)
+            and isinstance(entry[1], int) and isinstance(entry[2], (int, float))
+        ]
+        return session
+
+    def save(self, state, background=False):
+        """Escribe la sesión si ha cambiado; en segundo plano si se indica"""
+        data = json.dumps(state, separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            if data == self.last_saved:
+                return
+            self.last_saved = data
+            self._pending = data
+        if background:
+            threading.Thread(target=self.flush, daemon=True).start()
+        else:
+            self.flush()
+
+    def flush(self):
+        """Escribe la sesión pendiente más reciente, esperando a la escritura en curso"""
+        with self._write_lock:
+            with self._lock:
+                data, self._pending = self._pending, None
+            if data is None:
+                return
+            try:
+                write_atomic(self.path, data)
+            except OSError as e:
+                print(f"Advertencia: No se pudo guardar la sesión: {e}")
+
+    def start_autosave(self, collect, interval=AUTOSAVE_INTERVAL):
+        """Guarda periódicamente el estado devuelto por collect()"""
+        def autosave():
+            self.save(collect(), background=True)
+            return True
+        self.autosave_id = GLib.timeout_add_seconds(interval, autosave)
+
+    def stop_autosave(self):
+        if self.autosave_id is not None:
+            GLib.source_remove(self.autosave_id)
+            self.autosave_id = None
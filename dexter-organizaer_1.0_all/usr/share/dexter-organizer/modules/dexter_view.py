@@ -1 +1,132 @@
+#!/usr/bin/env python3
 
+import os
+import weakref
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk, GLib, Pango
+
+from modules.dexter_file_manager import extract_text
+from modules.dexter_preferents import get_preferences
+
+
+def on_font_changed(preferences, key, view_ref):
+    # Las preferencias viven toda la aplicación: guardan solo una referencia
+    # débil a la vista para no impedir que se libere al cerrarla
+    view = view_ref()
+    if view is not None:
+        view.apply_font()
+
+
+class DexterView(Gtk.Box):
+    """Vista de solo lectura de un documento"""
+
+    def __init__(self, path, preferences=None):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        self.path = path
+        self.preferences = preferences or get_preferences()
+        self.init_ui()
+        self.load_document()
+
+    def init_ui(self):
+        self.set_border_width(20)
+        self.set_hexpand(True)
+        self.set_vexpand(True)
+
+        # Nombre del documento y carpeta
+        title_label = Gtk.Label(label=os.path.basename(self.path))
+        title_label.set_halign(Gtk.Align.START)
+        title_label.get_style_context().add_class("start-title")
+        self.pack_start(title_label, False, False, 0)
+        folder_label = Gtk.Label(label=os.path.dirname(self.path))
+        folder_label.set_halign(Gtk.Align.START)
+        folder_label.set_ellipsize(Pango.EllipsizeMode.START)
+        folder_label.get_style_context().add_class("dim-label")
+        self.pack_start(folder_label, False, False, 0)
+
+        self.text_view = Gtk.TextView()
+        self.text_view.set_editable(False)
+        self.text_view.set_wrap_mode(Gtk.WrapMode.WORD_CHAR)
+        self.text_view.set_left_margin(5)
+        self.text_view.set_right_margin(5)
+        self.scroll = Gtk.ScrolledWindow()
+        self.scroll.set_hexpand(True)
+        self.scroll.set_vexpand(True)
+        self.scroll.add(self.text_view)
+        self.pack_start(self.scroll, True, True, 0)
+
+        # La fuente sigue a las preferencias sin necesidad de recargar la vista
+        self.apply_font()
+        view_ref = weakref.ref(self)
+        self.font_handlers = [
+            self.preferences.connect("changed::font-family", on_font_changed, view_ref),
+            self.preferences.connect("changed::font-size", on_font_changed, view_ref),
+        ]
+        self.connect("destroy", self.on_destroy)
+
+    def load_document(self):
+        try:
+            text = extract_text(self.path)
+        except Exception as e:
+            text = f"No se pudo abrir el documento:\n{e}"
+        self.text_view.get_buffer().set_text(text)
+
+    def get_state(self):
+        """Posición del cursor y desplazamiento vertical, para guardar la sesión"""
+        buffer = self.text_view.get_buffer()
+        cursor = buffer.get_iter_at_mark(buffer.get_insert()).get_offset()
+        return {"cursor": cursor, "scroll": self.scroll.get_vadjustment().get_value()}
+
+    def restore_state(self, state):
+        """Recupera el cursor y el desplazamiento guardados"""
+        buffer = self.text_view.get_buffer()
+        buffer.place_cursor(buffer.get_iter_at_offset(state.get("cursor", 0)))
+        scroll = state.get("scroll", 0)
+        if scroll <= 0:
+            return
+        adjustment = self.scroll.get_vadjustment()
+
+        # El texto se maqueta poco a poco: acompañar el crecimiento de la altura
+        # sin pasar del final. La maquetación se hace en reposo con más
+        # prioridad que PRIORITY_DEFAULT_IDLE, así que al llegar ese reposo ya
+        # ha terminado y se deja de seguir (el documento pudo acortarse).
+        def on_adjustment_changed(adjustment):
+            adjustment.set_value(min(scroll, adjustment.get_upper() - adjustment.get_page_size()))
+            if adjustment.get_value() >= scroll:
+                stop_following()
+            elif not waiting:
+                waiting.append(True)
+                GLib.idle_add(stop_following, priority=GLib.PRIORITY_DEFAULT_IDLE)
+
+        def stop_following():
+            if handler:
+                adjustment.disconnect(handler.pop())
+            return False
+        waiting = []
+        handler = [adjustment.connect("changed", on_adjustment_changed)]
+
+    def apply_font(self):
+        font = Pango.FontDescription.from_string(
+            f"{self.preferences.get_string('font-family')} {self.preferences.get_int('font-size')}"
+        )
+        self.text_view.override_font(font)
+
+    def on_destroy(self, widget):
+        for handler in self.font_handlers:
+            self.preferences.disconnect(handler)
+        self.font_handlers = []
+
+
+if __name__ == "__main__":
+    import sys
+    win = Gtk.Window(title="DexterView")
+    win.set_default_size(800, 600)
+    win.connect("destroy", Gtk.main_quit)
+
+    # Crear y añadir la vista del documento indicado
+    view = DexterView(sys.argv[1])
+    win.add(view)
+
+    # Mostrar todo y ejecutar
+    win.show_all()
+    Gtk.main()